@@ -0,0 +1,4 @@
+import dotenv
+
+# переменные из .env загружаются один раз, при первом импорте пакета приложения; уже заданные не меняются
+dotenv.load_dotenv()
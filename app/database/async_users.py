@@ -0,0 +1,348 @@
+from typing import Any, AsyncIterator, Iterable, Sequence
+
+import anyio
+from fastapi import HTTPException
+from sqlalchemy import Row, case, delete, func, insert, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database.cache import user_cache
+from app.database.changes import user_changes
+from app.database.counters import CountStrategy, estimate_statement, users_count
+from app.database.search import apply_user_filters
+from app.database.sessions import use_session
+from app.database.singleflight import user_reads
+from app.models.pagination import Cursor, CursorPage
+from app.models.user import (USER_FIELDS, VALIDATOR_FIELDS, UserData, UserCreateData, UserBatchUpdateData, UserFilter,
+                             utcnow)
+from app.monitoring.slow_queries import tag_queries
+from ..database.engine import get_async_engine, get_async_read_router
+
+
+async def read_all(statement) -> list:
+    """
+    Чтение через реплику (если задана) с откатом на primary
+    """
+    async def run(session: AsyncSession) -> list:
+        return list((await session.exec(statement)).all())
+
+    return await get_async_read_router().run_async(run)
+
+
+async def read_one(statement):
+    async def run(session: AsyncSession):
+        return (await session.exec(statement)).one()
+
+    return await get_async_read_router().run_async(run)
+
+
+async def read_first(statement):
+    async def run(session: AsyncSession):
+        return (await session.exec(statement)).first()
+
+    return await get_async_read_router().run_async(run)
+
+
+async def read_scalar(statement):
+    async def run(session: AsyncSession):
+        return (await session.execute(statement)).scalar()
+
+    return await get_async_read_router().run_async(run)
+
+
+def filters_key(filters: UserFilter | None) -> tuple | None:
+    return None if filters is None or filters.is_empty() else tuple(filters.model_dump().values())
+
+
+def invalidate_users(user_ids: Iterable[int]):
+    """
+    Сброс кэша по изменённым пользователям. Страницы и количество начинают читаться заново,
+    чтобы новые запросы не присоединялись к чтениям, начатым до записи
+    """
+    for user_id in user_ids:
+        user_cache.invalidate(user_id)
+        user_reads.forget('user', user_id)
+    user_reads.forget('page')
+    user_reads.forget('count')
+
+
+def select_users(fields: tuple[str, ...] | None = None):
+    """
+    SELECT пользователей: целиком (ORM-объекты) или только колонки fields и колонки ETag/Last-Modified (строки)
+    """
+    if fields is None:
+        return select(UserData)
+    names = {*fields, *VALIDATOR_FIELDS}
+    return select(*(getattr(UserData, name) for name in UserData.model_fields if name in names))
+
+
+@tag_queries
+async def get_user(user_id: int, fields: tuple[str, ...] | None = None) -> UserData | Row | None:
+    """
+    Пользователь по id. С fields при промахе кэша читаются только эти колонки, результат в кэш не попадает
+    """
+    found, user = user_cache.get(user_id)
+    if found:
+        return user
+
+    async def load() -> UserData | None:
+        generation = user_cache.generation()
+        db_user = await get_async_read_router().run_async(lambda session: session.get(UserData, user_id))
+        user_cache.set(user_id, db_user, generation)
+        return db_user
+
+    if fields is not None:
+        statement = select_users(fields).where(UserData.id == user_id)
+        return await user_reads.do(('user', user_id, fields), lambda: read_first(statement))
+    return await user_reads.do(('user', user_id), load)
+
+
+@tag_queries
+async def get_users() -> Sequence[UserData]:
+    return await read_all(select(UserData))
+
+
+@tag_queries
+async def get_users_page(offset: int, limit: int, filters: UserFilter | None = None,
+                         fields: tuple[str, ...] | None = None) -> Sequence[UserData | Row]:
+    statement = select_users(fields).order_by(UserData.id).offset(offset).limit(limit)
+    statement = apply_user_filters(statement, filters, get_async_engine().dialect.name)
+    return await user_reads.do(('page', offset, limit, filters_key(filters), fields), lambda: read_all(statement))
+
+
+@tag_queries
+async def get_users_keyset(size: int, cursor: Cursor | None = None, filters: UserFilter | None = None,
+                           fields: tuple[str, ...] | None = None) -> CursorPage:
+    """
+    Страница пользователей по курсору: WHERE id > / < курсора с LIMIT, без OFFSET и COUNT.
+    С fields в items строки только с выбранными колонками (без валидации модели)
+    """
+    backwards = cursor is not None and cursor.backwards
+    statement = apply_user_filters(select_users(fields).limit(size + 1), filters, get_async_engine().dialect.name)
+    if backwards:
+        statement = statement.where(UserData.id < cursor.id).order_by(UserData.id.desc())
+    else:
+        if cursor is not None:
+            statement = statement.where(UserData.id > cursor.id)
+        statement = statement.order_by(UserData.id)
+
+    rows = await read_all(statement)
+    has_more = len(rows) > size
+    items = rows[:size]
+    if backwards:
+        items.reverse()
+        # назад идём от уже показанной страницы, поэтому следующая страница есть всегда
+        has_next, has_previous = True, has_more
+    else:
+        has_next, has_previous = has_more, cursor is not None
+
+    if fields is None:
+        page = CursorPage(items=items, size=size)
+    else:
+        page = CursorPage.model_construct(items=items, size=size)
+    if items and has_next:
+        page.next = Cursor(id=items[-1].id).encode()
+    if items and has_previous:
+        page.previous = Cursor(id=items[0].id, backwards=True).encode()
+    return page
+
+
+async def iter_users(id_from: int | None = None, id_to: int | None = None,
+                     chunk_size: int = 1000) -> AsyncIterator[Sequence[dict[str, Any]]]:
+    """
+    Потоковое чтение пользователей (поля API) пачками по chunk_size строк через серверный курсор (yield_per),
+    без создания ORM-объектов
+    """
+    columns = UserData.__table__.c
+    statement = (select(*(columns[name] for name in USER_FIELDS)).order_by(UserData.id)
+                 .execution_options(yield_per=chunk_size))
+    if id_from is not None:
+        statement = statement.where(UserData.id >= id_from)
+    if id_to is not None:
+        statement = statement.where(UserData.id <= id_to)
+    # поток нельзя повторить на primary с середины, поэтому движок выбирается один раз
+    session = AsyncSession(get_async_read_router().read_engine())
+    result = None
+    try:
+        result = await session.stream(statement)
+        async for rows in result.mappings().partitions():
+            yield rows
+    finally:
+        # при обрыве клиентом генератор закрывается в уже отменённой области, без защиты закрытие курсора
+        # прерывается и соединение не возвращается в пул
+        with anyio.CancelScope(shield=True):
+            if result is not None:
+                await result.close()
+            await session.close()
+
+
+@tag_queries
+async def count_users(strategy: CountStrategy = CountStrategy.EXACT, filters: UserFilter | None = None) -> int:
+    """
+    Количество пользователей: точное, точное из кэша процесса или оценка по статистике БД.
+    С фильтрами всегда точный COUNT по индексам фильтра
+    """
+    if filters is not None and not filters.is_empty():
+        statement = apply_user_filters(select(func.count(UserData.id)), filters, get_async_engine().dialect.name)
+        return await user_reads.do(('count', filters_key(filters)), lambda: read_one(statement))
+    if strategy == CountStrategy.CACHED:
+        cached = users_count.get()
+        if cached is not None:
+            return cached
+    return await user_reads.do(('count', strategy), lambda: count_all_users(strategy))
+
+
+async def count_all_users(strategy: CountStrategy) -> int:
+    if strategy == CountStrategy.ESTIMATE:
+        estimate = await read_scalar(estimate_statement(get_async_engine().dialect.name))
+        if estimate is not None and estimate >= 0:
+            return estimate
+    total = await read_one(select(func.count(UserData.id)))
+    users_count.set(total)
+    return total
+
+
+@tag_queries
+async def create_user(user: UserData) -> UserData:
+    """
+    Создание пользователя одним INSERT ... RETURNING
+    """
+    statement = insert(UserData).values(**user.model_dump(exclude_none=True)).returning(UserData)
+    async with use_session(get_async_engine()) as session:
+        new_user = (await session.scalars(statement)).one()
+        await session.commit()
+    users_count.add(1)
+    invalidate_users([new_user.id])
+    user_changes.publish('created', new_user.id, new_user)
+    return new_user
+
+
+async def create_user_from_api_request(user: UserCreateData) -> UserData:
+    """
+    Создание пользователя в БД, с моделью по API
+    """
+    return await create_user(UserData(email='', first_name=user.name, last_name='', avatar='', job=user.job))
+
+
+@tag_queries
+async def update_user(user_id: int, user: UserCreateData, versions: set[int] | None = None) -> UserData:
+    """
+    Обновление пользователя одним UPDATE ... RETURNING, 404 если строка не найдена.
+    С versions (из If-Match) строка обновляется, только если её версия среди них, иначе 412
+    """
+    statement = (update(UserData).where(UserData.id == user_id)
+                 .values(first_name=user.name, job=user.job, updated_at=utcnow(), version=UserData.version + 1)
+                 .returning(UserData).execution_options(synchronize_session=False))
+    if versions is not None:
+        statement = statement.where(UserData.version.in_(versions))
+    async with use_session(get_async_engine()) as session:
+        db_user = (await session.scalars(statement)).one_or_none()
+        await session.commit()
+    if db_user is None:
+        raise_not_updated(versions)
+    invalidate_users([user_id])
+    user_changes.publish('updated', user_id, db_user)
+    return db_user
+
+
+@tag_queries
+async def delete_user(user_id: int, versions: set[int] | None = None):
+    """
+    Удаление пользователя одним DELETE ... RETURNING id, 404 если строка не найдена.
+    С versions (из If-Match) строка удаляется, только если её версия среди них, иначе 412
+    """
+    statement = (delete(UserData).where(UserData.id == user_id).returning(UserData.id)
+                 .execution_options(synchronize_session=False))
+    if versions is not None:
+        statement = statement.where(UserData.version.in_(versions))
+    async with use_session(get_async_engine()) as session:
+        deleted_id = (await session.scalars(statement)).one_or_none()
+        await session.commit()
+    if deleted_id is None:
+        raise_not_updated(versions)
+    users_count.add(-1)
+    invalidate_users([user_id])
+    user_changes.publish('deleted', user_id)
+
+
+def raise_not_updated(versions: set[int] | None):
+    """
+    Запись не затронула строку. С условием If-Match это 412 и для изменённой, и для удалённой строки (RFC 9110)
+    """
+    if versions is not None:
+        raise HTTPException(status_code=412, detail="User was modified")
+    raise HTTPException(status_code=404, detail="User not found")
+
+
+@tag_queries
+async def get_users_by_ids(ids: list[int]) -> dict[int, UserData]:
+    return {user.id: user for user in await read_all(select(UserData).where(UserData.id.in_(ids)))}
+
+
+@tag_queries
+async def create_users(new_users: list[UserCreateData]) -> list[UserData]:
+    """
+    Создание пачки пользователей одной транзакцией: многострочный INSERT ... RETURNING
+    """
+    if not new_users:
+        return []
+    now = utcnow()
+    rows = [dict(email='', first_name=user.name, last_name='', avatar='', job=user.job, updated_at=now, version=1)
+            for user in new_users]
+    statement = insert(UserData).returning(UserData, sort_by_parameter_order=True)
+    async with use_session(get_async_engine()) as session:
+        created = list((await session.scalars(statement, rows)).all())
+        await session.commit()
+    users_count.add(len(created))
+    invalidate_users(user.id for user in created)
+    user_changes.publish_many('created', created)
+    return created
+
+
+@tag_queries
+async def update_users(items: list[UserBatchUpdateData]) -> dict[int, UserData]:
+    """
+    Обновление пачки пользователей одним UPDATE ... WHERE id IN (...) RETURNING: новые значения подставляются
+    через CASE по id, версия увеличивается в самом UPDATE, поэтому одновременные пакеты не дают двум
+    разным содержимым одну версию. Возвращает обновлённых пользователей по id, отсутствующих в БД в ответе нет
+    """
+    if not items:
+        return {}
+    changes = {item.id: item for item in items}
+    statement = (update(UserData).where(UserData.id.in_(changes))
+                 .values(first_name=case({user_id: item.name for user_id, item in changes.items()}, value=UserData.id),
+                         job=case({user_id: item.job for user_id, item in changes.items()}, value=UserData.id),
+                         updated_at=utcnow(), version=UserData.version + 1)
+                 .returning(UserData).execution_options(synchronize_session=False))
+    async with use_session(get_async_engine()) as session:
+        db_users = {user.id: user for user in (await session.scalars(statement)).all()}
+        await session.commit()
+    invalidate_users(db_users)
+    user_changes.publish_many('updated', db_users.values())
+    return db_users
+
+
+@tag_queries
+async def delete_users(ids: list[int]) -> set[int]:
+    """
+    Удаление пачки пользователей одним DELETE ... WHERE id IN (...) RETURNING id
+    """
+    statement = (delete(UserData).where(UserData.id.in_(ids)).returning(UserData.id)
+                 .execution_options(synchronize_session=False))
+    async with use_session(get_async_engine()) as session:
+        deleted = set((await session.scalars(statement)).all())
+        await session.commit()
+    users_count.add(-len(deleted))
+    invalidate_users(deleted)
+    for user_id in sorted(deleted):
+        user_changes.publish('deleted', user_id)
+    return deleted
+
+
+@tag_queries
+async def get_max_user_id() -> int:
+    """
+    Получение текущего максимального id по таблице пользователей
+    """
+    async with use_session(get_async_engine()) as session:
+        return (await session.exec(select(func.max(UserData.id)))).one()
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable
+
+from app.database import async_users
+from app.database.sessions import detached_context
+from app.models.user import UserCreateData, UserData
+
+USERS_WRITE_BATCHING = os.getenv('USERS_WRITE_BATCHING', 'false').lower() == 'true'
+USERS_WRITE_BATCH_SIZE = int(os.getenv('USERS_WRITE_BATCH_SIZE', 100))
+USERS_WRITE_BATCH_DELAY_MS = float(os.getenv('USERS_WRITE_BATCH_DELAY_MS', 5))
+
+logger = logging.getLogger(__name__)
+
+
+class CreateBatcher:
+    """
+    Group commit для создания пользователей: запросы копятся в процессе и записываются одним
+    многострочным INSERT ... RETURNING на пачку. Пачка уходит при max_size элементах или через max_delay
+    секунд после первого элемента. Ошибка записи пачки получают все её запросы
+    """
+
+    def __init__(self, write: Callable[[list[UserCreateData]], Awaitable[list[UserData]]],
+                 max_size: int, max_delay: float, enabled: bool = False):
+        self.write = write
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.enabled = enabled
+        self._pending: list[tuple[UserCreateData, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._flushes: set[asyncio.Task] = set()
+        self._closed = False
+
+    async def submit(self, user: UserCreateData) -> UserData:
+        if self._closed:
+            raise RuntimeError('Create batcher is closed')
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((user, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+        # отменённый клиентом запрос всё равно будет записан: пачка уже сформирована
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        # пачка пишется за несколько запросов, поэтому своей сессией, а не сессией первого из них
+        task = asyncio.create_task(self._write(batch), context=detached_context())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _write(self, batch: list[tuple[UserCreateData, asyncio.Future]]):
+        try:
+            created = await self.write([user for user, _ in batch])
+        except Exception as e:
+            logger.warning('Batch of %s user creates failed: %s', len(batch), e)
+            self._fail(batch, e)
+            return
+        except BaseException:
+            # отменённая запись (остановка цикла событий) не должна оставить запросы пачки ждать вечно
+            self._fail(batch, RuntimeError('Batch write was cancelled'))
+            raise
+        for (_, future), user in zip(batch, created):
+            if not future.done():
+                future.set_result(user)
+
+    @staticmethod
+    def _fail(batch: list[tuple[UserCreateData, asyncio.Future]], error: BaseException):
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    def start(self):
+        """
+        Запуск приёма при старте приложения: батчер модульный и переживает остановку предыдущего lifespan
+        """
+        self._closed = False
+
+    async def drain(self):
+        """
+        Остановка: новые запросы не принимаются, накопленные записываются, дожидаемся всех пачек
+        """
+        self._closed = True
+        self._flush()
+        await asyncio.gather(*self._flushes, return_exceptions=True)
+
+
+user_creates = CreateBatcher(async_users.create_users, USERS_WRITE_BATCH_SIZE, USERS_WRITE_BATCH_DELAY_MS / 1000,
+                             enabled=USERS_WRITE_BATCHING)
@@ -0,0 +1,139 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Protocol
+
+from app.database.engine import APP_WORKERS
+from app.models.app import CacheStats
+from app.models.user import UserData
+
+# кэш в памяти процесса: запись инвалидирует только воркер, который её выполнил, поэтому при APP_WORKERS > 1
+# остальные отдавали бы старые данные и ETag до истечения TTL. Там кэш выключен (TTL 0)
+PROCESS_CACHES_ENABLED = APP_WORKERS == 1
+
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 10000))
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', 60)) if PROCESS_CACHES_ENABLED else 0
+USER_CACHE_NEGATIVE_TTL = float(os.getenv('USER_CACHE_NEGATIVE_TTL', 5)) if PROCESS_CACHES_ENABLED else 0
+
+
+class CacheBackend(Protocol):
+    """
+    Хранилище кэша. Реализация в памяти ниже, Redis-совместимая подключается через UserCache.backend
+    """
+
+    def get(self, key: Hashable) -> tuple[bool, Any]: ...
+
+    def set(self, key: Hashable, value: Any, ttl: float): ...
+
+    def delete(self, key: Hashable): ...
+
+    def clear(self): ...
+
+    def stats(self) -> CacheStats: ...
+
+
+class MemoryCache:
+    """
+    LRU-кэш в памяти процесса с TTL на каждую запись
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float):
+        if self.max_size <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(hits=self.hits, misses=self.misses, evictions=self.evictions,
+                              size=len(self._entries), max_size=self.max_size)
+
+
+class UserCache:
+    """
+    Read-through кэш пользователей по id. Хранит данные пользователя, для 404 хранит None с коротким TTL.
+    Прочитанное из БД кладётся в кэш, только если пользователя не инвалидировали после начала чтения:
+    иначе чтение, начатое до записи, вернуло бы в кэш старую строку на весь TTL
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float, negative_ttl: float, max_tracked: int = USER_CACHE_SIZE):
+        self.backend = backend
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_tracked = max(1, max_tracked)
+        self._generation = 0
+        # номер последней инвалидации по id; вытесненные номера поднимают общий порог
+        self._invalidated: OrderedDict[int, int] = OrderedDict()
+        self._floor = 0
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> tuple[bool, UserData | None]:
+        found, data = self.backend.get(user_id)
+        if not found or data is None:
+            return found, None
+        return True, UserData(**data)
+
+    def generation(self) -> int:
+        """
+        Отметка перед чтением из БД, передаётся в set
+        """
+        with self._lock:
+            return self._generation
+
+    def set(self, user_id: int, user: UserData | None, generation: int | None = None):
+        with self._lock:
+            if generation is not None and max(self._floor, self._invalidated.get(user_id, 0)) > generation:
+                return
+            if user is None:
+                self.backend.set(user_id, None, self.negative_ttl)
+            else:
+                self.backend.set(user_id, user.model_dump(), self.ttl)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._generation += 1
+            self._invalidated[user_id] = self._generation
+            self._invalidated.move_to_end(user_id)
+            while len(self._invalidated) > self.max_tracked:
+                _, evicted = self._invalidated.popitem(last=False)
+                self._floor = max(self._floor, evicted)
+            self.backend.delete(user_id)
+
+    def stats(self) -> CacheStats:
+        return self.backend.stats()
+
+
+user_cache = UserCache(MemoryCache(USER_CACHE_SIZE), USER_CACHE_TTL, USER_CACHE_NEGATIVE_TTL)
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import os
+from collections import deque
+from typing import AsyncIterator, Iterable
+
+from app.models.user import UserChange, UserData
+
+USERS_CHANGES_HISTORY = int(os.getenv('USERS_CHANGES_HISTORY', 10000))
+USERS_CHANGES_BUFFER = int(os.getenv('USERS_CHANGES_BUFFER', 1000))
+USERS_CHANGES_HEARTBEAT = float(os.getenv('USERS_CHANGES_HEARTBEAT', 15))
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    Подписка на изменения: пропущенные события из истории (backlog) и очередь новых на buffer_size событий.
+    reset_id задан, если позиция клиента не найдена в истории: ему нужна полная пересинхронизация,
+    после которой изменения идут с reset_id
+    """
+
+    def __init__(self, buffer_size: int, backlog: list[UserChange], reset_id: int | None = None):
+        self.queue: asyncio.Queue[UserChange] = asyncio.Queue(buffer_size)
+        self.backlog = backlog
+        self.reset_id = reset_id
+        self.dropped = False
+
+    async def events(self, heartbeat: float) -> AsyncIterator[UserChange | None]:
+        """
+        События подписки; None раз в heartbeat секунд без событий. Отключённая подписка отдаёт уже
+        полученные события и завершается, клиент продолжает с последнего id
+        """
+        for change in self.backlog:
+            yield change
+        self.backlog = []
+        while not (self.dropped and self.queue.empty()):
+            try:
+                yield await asyncio.wait_for(self.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+
+
+class ChangeBroadcaster:
+    """
+    Рассылка изменений пользователей подписчикам процесса. id изменения растёт монотонно,
+    последние history_size изменений хранятся для продолжения после переподключения.
+    Подписчик, очередь которого заполнена, отключается, чтобы не задерживать запись и остальных
+    """
+
+    def __init__(self, history_size: int, buffer_size: int):
+        self.buffer_size = buffer_size
+        self.last_id = 0
+        self.dropped = 0
+        self._history: deque[UserChange] = deque(maxlen=history_size)
+        self._subscribers: set[Subscription] = set()
+
+    def publish(self, kind: str, user_id: int, user: UserData | None = None):
+        self.last_id += 1
+        change = UserChange(id=self.last_id, type=kind, user_id=user_id, data=user)
+        self._history.append(change)
+        for subscription in list(self._subscribers):
+            try:
+                subscription.queue.put_nowait(change)
+            except asyncio.QueueFull:
+                self._drop(subscription)
+
+    def publish_many(self, kind: str, users: Iterable[UserData]):
+        for user in users:
+            self.publish(kind, user.id, user)
+
+    def subscribe(self, after: int | None = None) -> Subscription:
+        """
+        Новая подписка; с after сначала отдаются изменения с id больше него
+        """
+        backlog, reset_id = [], None
+        if after is not None and after != self.last_id:
+            oldest = self._history[0].id if self._history else self.last_id + 1
+            if after > self.last_id or after < oldest - 1:
+                # id из другого процесса или до перезапуска, либо история уже вытеснена
+                reset_id = self.last_id
+            else:
+                backlog = [change for change in self._history if change.id > after]
+        subscription = Subscription(self.buffer_size, backlog, reset_id)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def _drop(self, subscription: Subscription):
+        logger.warning('Change feed subscriber dropped, %s events buffered', subscription.queue.qsize())
+        subscription.dropped = True
+        self._subscribers.discard(subscription)
+        self.dropped += 1
+
+
+user_changes = ChangeBroadcaster(USERS_CHANGES_HISTORY, USERS_CHANGES_BUFFER)
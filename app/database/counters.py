@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+from enum import StrEnum
+
+from sqlalchemy import TextClause, text
+
+from app.database.cache import PROCESS_CACHES_ENABLED
+from app.models.user import UserData
+
+
+class CountStrategy(StrEnum):
+    EXACT = 'exact'
+    CACHED = 'cached'
+    ESTIMATE = 'estimate'
+
+
+USERS_COUNT_STRATEGY = CountStrategy(os.getenv('USERS_COUNT_STRATEGY', CountStrategy.EXACT))
+# при APP_WORKERS > 1 стратегия cached считает точно: удаление в другом воркере не поправит счётчик этого
+USERS_COUNT_CACHE_TTL = float(os.getenv('USERS_COUNT_CACHE_TTL', 60)) if PROCESS_CACHES_ENABLED else 0
+
+
+class CachedCount:
+    """
+    Точное количество строк в памяти процесса. Поправляется операциями записи этого процесса,
+    а раз в ttl секунд пересчитывается. С ttl 0 не хранится
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._value: int | None = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> int | None:
+        with self._lock:
+            if self._value is None or time.monotonic() - self._loaded_at > self.ttl:
+                return None
+            return self._value
+
+    def set(self, value: int):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._value = value
+            self._loaded_at = time.monotonic()
+
+    def add(self, delta: int):
+        with self._lock:
+            if self._value is not None:
+                self._value += delta
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+
+
+users_count = CachedCount(USERS_COUNT_CACHE_TTL)
+
+
+def estimate_statement(dialect_name: str) -> TextClause:
+    """
+    Оценка количества пользователей без прохода по таблице.
+    Postgres: статистика планировщика (-1, если таблица ещё не анализировалась).
+    SQLite: max(id) по первичному ключу, удалённые строки не вычитаются
+    """
+    table = UserData.__tablename__
+    if dialect_name == 'postgresql':
+        return text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)").bindparams(table=table)
+    return text(f"SELECT max(id) FROM {table}")
@@ -1,24 +1,176 @@
+import functools
+import logging
 import os
 
-import dotenv
-
-dotenv.load_dotenv()
-
+from sqlalchemy import URL, Connection, Engine, inspect, literal, make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn
 from sqlmodel import create_engine, SQLModel, text
 
-engine = create_engine(os.getenv("DATABASE_ENGINE"), pool_size=int(os.getenv('DATABASE_POOL_SIZE')))
+from app.database.routing import ReadRouter
+
+logger = logging.getLogger(__name__)
+
+ASYNC_DRIVERS = {'postgresql': 'asyncpg', 'sqlite': 'aiosqlite'}
+APP_WORKERS = int(os.getenv('APP_WORKERS', 1))
+# pool_size SQLAlchemy по умолчанию, если DATABASE_POOL_SIZE не задан
+DEFAULT_POOL_SIZE = 5
+
+
+def worker_pool_size() -> int:
+    """
+    DATABASE_POOL_SIZE - бюджет соединений на весь сервис, каждый из APP_WORKERS процессов получает свою долю
+    """
+    return max(1, int(os.getenv('DATABASE_POOL_SIZE') or DEFAULT_POOL_SIZE) // APP_WORKERS)
+
+
+def async_database_url(database_url: str) -> URL:
+    """
+    Подмена драйвера в DATABASE_ENGINE на асинхронный: asyncpg для Postgres, aiosqlite для SQLite
+    """
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'Нет асинхронного драйвера для {backend}')
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+
+
+def _async_engine_options(url: URL) -> dict:
+    # aiosqlite сам выбирает пул под файл/память, pool_size ему передавать нельзя
+    if url.get_backend_name() == 'sqlite':
+        return {}
+    return {'pool_size': worker_pool_size()}
+
+
+def _create_async_engine(database_url: str):
+    url = async_database_url(database_url)
+    return create_async_engine(url, **_async_engine_options(url))
+
+
+# движки создаются при первом обращении, а не при импорте: импорт приложения не загружает драйверы БД
+# и не требует DATABASE_ENGINE, пока нет запросов к БД
+@functools.cache
+def get_engine() -> Engine:
+    return create_engine(os.getenv("DATABASE_ENGINE"), pool_size=worker_pool_size())
+
+
+@functools.cache
+def get_async_engine() -> AsyncEngine:
+    return _create_async_engine(os.getenv("DATABASE_ENGINE"))
+
+
+def replica_configured() -> bool:
+    """
+    Необязательная реплика для чтения DATABASE_REPLICA_ENGINE, со своим пулом соединений
+    """
+    return bool(os.getenv('DATABASE_REPLICA_ENGINE'))
+
+
+@functools.cache
+def get_replica_engine() -> Engine | None:
+    if not replica_configured():
+        return None
+    return create_engine(os.getenv('DATABASE_REPLICA_ENGINE'), pool_size=worker_pool_size())
+
+
+@functools.cache
+def get_async_replica_engine() -> AsyncEngine | None:
+    return _create_async_engine(os.getenv('DATABASE_REPLICA_ENGINE')) if replica_configured() else None
+
+
+@functools.cache
+def get_read_router() -> ReadRouter[Engine]:
+    return ReadRouter(get_engine(), get_replica_engine())
+
+
+@functools.cache
+def get_async_read_router() -> ReadRouter[AsyncEngine]:
+    return ReadRouter(get_async_engine(), get_async_replica_engine())
+
+
+LAZY_ATTRIBUTES = {'engine': get_engine, 'async_engine': get_async_engine, 'replica_engine': get_replica_engine,
+                   'async_replica_engine': get_async_replica_engine, 'read_router': get_read_router,
+                   'async_read_router': get_async_read_router}
+
+
+def __getattr__(name: str):
+    # совместимость с from app.database.engine import engine: движок создаётся при таком импорте
+    if name in LAZY_ATTRIBUTES:
+        return LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
+    with get_engine().begin() as connection:
+        SQLModel.metadata.create_all(connection)
+        create_missing_columns(connection)
+        create_missing_indexes(connection)
+
+
+def create_missing_columns(connection: Connection):
+    """
+    create_all не меняет существующие таблицы, колонки, добавленные в модель позже, досоздаём через ALTER TABLE.
+    Уже существующие строки получают значение по умолчанию из модели на момент миграции
+    """
+    inspector = inspect(connection)
+    for table in SQLModel.metadata.sorted_tables:
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = str(CreateColumn(column).compile(dialect=connection.dialect))
+            if column.default is not None:
+                value = column.default.arg(None) if column.default.is_callable else column.default.arg
+                default = literal(value, column.type).compile(dialect=connection.dialect,
+                                                              compile_kwargs={'literal_binds': True})
+                ddl += f' DEFAULT {default}'
+            connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {ddl}'))
+            logger.info('Column %s.%s added', table.name, column.name)
+
+
+def existing_indexes(connection: Connection, table_name: str) -> set[str]:
+    existing = {index['name'] for index in inspect(connection).get_indexes(table_name)}
+    if connection.dialect.name == 'sqlite':
+        # инспектор SQLite пропускает индексы по выражениям, их имена берём из sqlite_master
+        existing.update(connection.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table"),
+            {'table': table_name}).scalars())
+    return existing
+
+
+def create_missing_indexes(connection: Connection):
+    """
+    create_all создаёт индексы только вместе с новой таблицей, для уже существующих таблиц досоздаём их отдельно
+    """
+    for table in SQLModel.metadata.sorted_tables:
+        existing = existing_indexes(connection, table.name)
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            try:
+                with connection.begin_nested():
+                    index.create(connection)
+            except IntegrityError as e:
+                logger.warning('Index %s was not created, data violates it: %s', index.name, e)
 
 
 def check_availability() -> bool:
     try:
-        with Session(engine) as session:
+        with Session(get_engine()) as session:
             session.execute(text("SELECT 1"))
         return True
     except Exception as e:
-        print(e)
+        logger.warning('Database is not available: %s', e)
+        return False
+
+
+async def async_check_availability() -> bool:
+    try:
+        async with get_async_engine().connect() as connection:
+            await connection.execute(text("SELECT 1"))
+        return True
+    except Exception as e:
+        logger.warning('Database is not available: %s', e)
         return False
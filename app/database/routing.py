@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import os
+import time
+from contextvars import ContextVar
+from http.cookies import SimpleCookie
+from typing import Awaitable, Callable, Generic, TypeVar
+
+from sqlalchemy import Engine
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database.sessions import use_session
+
+READ_YOUR_WRITES_WINDOW = float(os.getenv('READ_YOUR_WRITES_WINDOW', 5))
+REPLICA_RETRY_AFTER = float(os.getenv('REPLICA_RETRY_AFTER', 30))
+STICKY_COOKIE = 'read_primary_until'
+
+# чтение текущего запроса должно идти в primary: клиент недавно писал
+prefer_primary: ContextVar[bool] = ContextVar('prefer_primary', default=False)
+
+# ошибки, после которых реплика считается недоступной и чтение повторяется на primary
+REPLICA_ERRORS = (OperationalError, InterfaceError, OSError, asyncio.TimeoutError)
+
+logger = logging.getLogger(__name__)
+
+EngineT = TypeVar('EngineT', Engine, AsyncEngine)
+T = TypeVar('T')
+
+
+class ReadRouter(Generic[EngineT]):
+    """
+    Выбор движка для чтения: реплика, если она задана, не помечена недоступной и клиент недавно не писал.
+    Запись всегда идёт через primary
+    """
+
+    def __init__(self, primary: EngineT, replica: EngineT | None = None, retry_after: float = REPLICA_RETRY_AFTER):
+        self.primary = primary
+        self.replica = replica
+        self.retry_after = retry_after
+        self._replica_down_until = 0.0
+
+    @property
+    def replica_available(self) -> bool:
+        return self.replica is not None and time.monotonic() >= self._replica_down_until
+
+    def read_engine(self) -> EngineT:
+        if self.replica_available and not prefer_primary.get():
+            return self.replica
+        return self.primary
+
+    def mark_replica_down(self, error: Exception):
+        logger.warning('Read replica is unavailable for %ss, reading from primary: %s', self.retry_after, error)
+        self._replica_down_until = time.monotonic() + self.retry_after
+
+    def run(self, fn: Callable[[Session], T]) -> T:
+        engine = self.read_engine()
+        try:
+            with Session(engine) as session:
+                return fn(session)
+        except REPLICA_ERRORS as e:
+            if engine is self.primary:
+                raise
+            self.mark_replica_down(e)
+        with Session(self.primary) as session:
+            return fn(session)
+
+    async def run_async(self, fn: Callable[[AsyncSession], Awaitable[T]]) -> T:
+        engine = self.read_engine()
+        try:
+            async with use_session(engine) as session:
+                return await fn(session)
+        except REPLICA_ERRORS as e:
+            if engine is self.primary:
+                raise
+            self.mark_replica_down(e)
+        async with use_session(self.primary) as session:
+            return await fn(session)
+
+
+class ReadYourWritesMiddleware:
+    """
+    После успешной записи клиент получает cookie со сроком READ_YOUR_WRITES_WINDOW секунд,
+    пока она действует, его чтения идут в primary и не видят отставания реплики
+    """
+
+    def __init__(self, app, window: float = READ_YOUR_WRITES_WINDOW):
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        token = prefer_primary.set(self._sticky(scope))
+        is_write = scope['method'] not in ('GET', 'HEAD', 'OPTIONS')
+
+        async def send_with_cookie(message):
+            if is_write and message['type'] == 'http.response.start' and message['status'] < 400:
+                cookie = f'{STICKY_COOKIE}={time.time() + self.window:.3f}; Max-Age={int(self.window) or 1}; Path=/'
+                message['headers'] = [*message.get('headers', []), (b'set-cookie', cookie.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            prefer_primary.reset(token)
+
+    @staticmethod
+    def _sticky(scope) -> bool:
+        for name, value in scope['headers']:
+            if name == b'cookie':
+                morsel = SimpleCookie(value.decode('latin-1')).get(STICKY_COOKIE)
+                if morsel is not None:
+                    try:
+                        return float(morsel.value) > time.time()
+                    except ValueError:
+                        return False
+        return False
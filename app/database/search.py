@@ -0,0 +1,37 @@
+from sqlalchemy import ColumnElement, Select, and_, bindparam, func
+
+from app.models.user import UserData, UserFilter
+
+PREFIX_UPPER_BOUND = '\U0010ffff'
+
+
+def escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def prefix_condition(column, prefix: str, dialect_name: str) -> ColumnElement[bool]:
+    """
+    Префикс без учёта регистра по индексу на lower(column).
+    Postgres: LIKE 'prefix%' с подставленным в текст запроса значением, чтобы и подготовленные
+    выражения asyncpg планировались по индексу. SQLite: диапазон lower(column) >= prefix < prefix + max char
+    """
+    value = prefix.lower()
+    lowered = func.lower(column)
+    if dialect_name == 'postgresql':
+        return lowered.like(bindparam(None, escape_like(value) + '%', literal_execute=True), escape='\\')
+    return and_(lowered >= value, lowered < value + PREFIX_UPPER_BOUND)
+
+
+def apply_user_filters(statement: Select, filters: UserFilter | None, dialect_name: str) -> Select:
+    if filters is None:
+        return statement
+    if filters.email is not None:
+        # условие email <> '' совпадает с условием частичного индекса uq_userdata_email
+        statement = statement.where(UserData.email == filters.email, UserData.email != '')
+    if filters.first_name is not None:
+        statement = statement.where(prefix_condition(UserData.first_name, filters.first_name, dialect_name))
+    if filters.last_name is not None:
+        statement = statement.where(prefix_condition(UserData.last_name, filters.last_name, dialect_name))
+    if filters.job is not None:
+        statement = statement.where(UserData.job == filters.job)
+    return statement
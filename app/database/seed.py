@@ -0,0 +1,142 @@
+import hashlib
+import logging
+
+from sqlalchemy import Column, Connection, MetaData, String, Table, and_, delete, func, insert, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import aliased
+from sqlalchemy.schema import CreateIndex, CreateTable
+from sqlmodel import SQLModel
+
+from app.database.data import users_data
+from app.database.cache import user_cache
+from app.database.counters import users_count
+from app.database.engine import create_missing_columns, create_missing_indexes, existing_indexes, get_engine
+from app.models.user import USER_FIELDS, UserData
+
+# ключ pg_advisory_xact_lock, общий для всех воркеров и реплик сервиса
+SEED_LOCK_KEY = 0x75736572
+# уникальный индекс, по которому ON CONFLICT пропускает уже вставленных начальных пользователей
+EMAIL_INDEX = 'uq_userdata_email'
+
+logger = logging.getLogger(__name__)
+
+# отпечаток схемы, для которой уже выполнен DDL; отдельные метаданные, чтобы таблица не входила в отпечаток
+schema_metadata = MetaData()
+schema_version = Table('app_schema_version', schema_metadata, Column('fingerprint', String(64), primary_key=True))
+
+
+def schema_fingerprint(dialect) -> str:
+    """
+    sha256 DDL таблиц и индексов моделей: меняется при любом изменении схемы в коде
+    """
+    ddl = [str(CreateTable(table).compile(dialect=dialect)) for table in SQLModel.metadata.sorted_tables]
+    ddl += [str(CreateIndex(index).compile(dialect=dialect))
+            for table in SQLModel.metadata.sorted_tables for index in sorted(table.indexes, key=lambda i: i.name)]
+    return hashlib.sha256('\n'.join(ddl).encode()).hexdigest()
+
+
+def seed_users_statement(dialect_name: str):
+    """
+    Вставка начальных пользователей одним выражением, существующие email пропускаются (ON CONFLICT DO NOTHING)
+    """
+    insert = postgresql.insert if dialect_name == 'postgresql' else sqlite.insert
+    rows = [user.model_dump(exclude_none=True) for user in users_data.values()]
+    return (insert(UserData).values(rows)
+            .on_conflict_do_nothing(index_elements=[UserData.email], index_where=UserData.email != ''))
+
+
+def remove_duplicate_seed_users(connection: Connection) -> int:
+    """
+    Раньше начальные пользователи вставлялись при каждом запуске, в таких БД их email повторяются
+    и индекс uq_userdata_email не создаётся. Удаляются только копии, совпадающие с начальными данными
+    во всех полях, при наличии более старой строки с тем же email: изменённые через API строки не трогаем
+    """
+    duplicate = aliased(UserData)
+    has_older_copy = select(duplicate.id).where(duplicate.email == UserData.email, duplicate.id < UserData.id).exists()
+    columns = [name for name in USER_FIELDS if name != 'id']
+    is_seed_copy = or_(*(and_(*(getattr(UserData, name) == getattr(user, name) for name in columns))
+                         for user in users_data.values()))
+    statement = (delete(UserData).where(is_seed_copy, has_older_copy)
+                 .execution_options(synchronize_session=False))
+    return connection.execute(statement).rowcount
+
+
+def duplicate_emails(connection: Connection) -> list[str]:
+    statement = (select(UserData.email).where(UserData.email != '').group_by(UserData.email)
+                 .having(func.count() > 1).order_by(UserData.email))
+    return list(connection.execute(statement).scalars())
+
+
+def seed_users(connection: Connection):
+    """
+    Вставка начальных пользователей. Если индекс по email создать не удалось, ON CONFLICT по нему невозможен:
+    вставляются только отсутствующие email, под той же блокировкой
+    """
+    if EMAIL_INDEX in existing_indexes(connection, UserData.__tablename__):
+        connection.execute(seed_users_statement(connection.dialect.name))
+        return
+    emails = [user.email for user in users_data.values()]
+    present = set(connection.execute(select(UserData.email).where(UserData.email.in_(emails))).scalars())
+    rows = [user.model_dump(exclude_none=True) for user in users_data.values() if user.email not in present]
+    if rows:
+        connection.execute(insert(UserData), rows)
+
+
+def is_seeded(connection: Connection, fingerprint: str) -> bool:
+    """
+    Схема в БД совпадает с моделями и начальные пользователи на месте: два SELECT без DDL и блокировок
+    """
+    try:
+        current = connection.execute(select(schema_version.c.fingerprint)).scalar()
+    except DBAPIError:
+        # таблицы отпечатка ещё нет: первый запуск или БД до появления проверки
+        connection.rollback()
+        return False
+    if current != fingerprint:
+        return False
+    emails = [user.email for user in users_data.values()]
+    seeded = connection.execute(select(func.count()).select_from(UserData).where(UserData.email.in_(emails)))
+    return seeded.scalar() == len(emails)
+
+
+def seed_database():
+    """
+    Создание схемы и начальных пользователей. Если схема текущая и данные есть, DDL и вставка пропускаются.
+    Иначе в Postgres выполняется под advisory lock в одной транзакции, поэтому при N воркерах
+    или перезапуске на существующем volume данные создаются ровно один раз
+    """
+    engine = get_engine()
+    fingerprint = schema_fingerprint(engine.dialect)
+    with engine.connect() as connection:
+        seeded = is_seeded(connection, fingerprint)
+    if not seeded:
+        with engine.begin() as connection:
+            lock(connection)
+            SQLModel.metadata.create_all(connection)
+            create_missing_columns(connection)
+            if EMAIL_INDEX not in existing_indexes(connection, UserData.__tablename__):
+                removed = remove_duplicate_seed_users(connection)
+                if removed:
+                    logger.warning('Removed %s unchanged copies of seed users before creating %s',
+                                   removed, EMAIL_INDEX)
+            create_missing_indexes(connection)
+            seed_users(connection)
+            migrated = EMAIL_INDEX in existing_indexes(connection, UserData.__tablename__)
+            if migrated:
+                schema_metadata.create_all(connection)
+                connection.execute(schema_version.delete())
+                connection.execute(schema_version.insert().values(fingerprint=fingerprint))
+            else:
+                # отпечаток не записывается: следующий запуск снова попробует создать индекс
+                logger.error('Index %s is not created, users with duplicate emails must be resolved manually: %s',
+                             EMAIL_INDEX, ', '.join(duplicate_emails(connection)))
+        if migrated:
+            logger.info('Database schema %s applied and seed users inserted', fingerprint[:12])
+    users_count.invalidate()
+    user_cache.backend.clear()
+
+
+def lock(connection: Connection):
+    if connection.dialect.name == 'postgresql':
+        connection.execute(select(func.pg_advisory_xact_lock(SEED_LOCK_KEY)))
@@ -0,0 +1,122 @@
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import Context, ContextVar, copy_context
+from typing import AsyncIterator
+
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+
+class SessionScope:
+    """
+    Сессии одного запроса (unit of work): по одной AsyncSession на движок, открываются при первом обращении
+    и закрываются в close(). Сессия привязана к соединению, взятому при открытии: commit завершает транзакцию,
+    но не возвращает соединение в пул, поэтому запрос занимает не больше одного соединения каждого пула.
+    label - метод и путь запроса, endpoint - имя хэндлера
+    """
+
+    def __init__(self, label: str = '', endpoint: str | None = None):
+        self.label = label
+        self.endpoint = endpoint
+        self._sessions: dict[AsyncEngine, AsyncSession] = {}
+        self._opening = asyncio.Lock()
+        self.closed = False
+        self._in_use = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def session(self, engine: AsyncEngine) -> AsyncSession:
+        session = self._sessions.get(engine)
+        if session is not None:
+            return session
+        # одновременные блоки запроса (gather, single-flight) не должны взять второе соединение
+        async with self._opening:
+            session = self._sessions.get(engine)
+            if session is None:
+                connection = await engine.connect()
+                session = self._sessions[engine] = AsyncSession(bind=connection, expire_on_commit=False)
+        return session
+
+    async def discard(self, engine: AsyncEngine):
+        session = self._sessions.pop(engine, None)
+        if session is not None:
+            await close_session(session)
+
+    async def close(self):
+        # чтение, объединённое single-flight, может ещё идти в задаче после отмены запроса;
+        # задача, дошедшая до use_session после закрытия, откроет отдельную сессию
+        self.closed = True
+        await self._idle.wait()
+        sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            await close_session(session)
+
+    def _enter(self):
+        self._in_use += 1
+        self._idle.clear()
+
+    def _exit(self):
+        self._in_use -= 1
+        if not self._in_use:
+            self._idle.set()
+
+
+async def close_session(session: AsyncSession):
+    connection = session.bind
+    try:
+        await session.close()
+    finally:
+        await connection.close()
+
+
+request_sessions: ContextVar[SessionScope | None] = ContextVar('request_sessions', default=None)
+
+
+@asynccontextmanager
+async def use_session(engine: AsyncEngine) -> AsyncIterator[AsyncSession]:
+    """
+    Сессия запроса для engine, вне запроса или после его завершения - отдельная сессия на блок.
+    Объекты отсоединяются после блока, как при закрытии отдельной сессии; после ошибки сессия запроса
+    закрывается и следующий блок откроет новую
+    """
+    scope = request_sessions.get()
+    if scope is None or scope.closed:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            yield session
+        return
+    scope._enter()
+    try:
+        session = await scope.session(engine)
+        try:
+            yield session
+        except BaseException:
+            await scope.discard(engine)
+            raise
+        else:
+            session.expunge_all()
+    finally:
+        scope._exit()
+
+
+async def request_session_scope(request: Request) -> AsyncIterator[SessionScope]:
+    """
+    Зависимость роутера: общая сессия для всех хелперов БД, вызванных запросом, закрывается по его завершении
+    """
+    endpoint = request.scope.get('endpoint')
+    scope = SessionScope(f'{request.method} {request.url.path}', endpoint.__name__ if endpoint else None)
+    token = request_sessions.set(scope)
+    try:
+        yield scope
+    finally:
+        await scope.close()
+        request_sessions.reset(token)
+
+
+def detached_context() -> Context:
+    """
+    Контекст для фоновых задач, переживающих запрос: они открывают свои сессии, а не сессию запроса
+    """
+    context = copy_context()
+    context.run(request_sessions.set, None)
+    return context
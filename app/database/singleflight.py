@@ -0,0 +1,51 @@
+import asyncio
+from collections import Counter
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+from app.database.routing import prefer_primary
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    """
+    Объединение одинаковых одновременных чтений: первый запрос по ключу выполняет запрос к БД,
+    остальные ждут его результат (или исключение). Ключ - кортеж, первый элемент которого вид чтения
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Task] = {}
+        self.leaders: Counter[str] = Counter()
+        self.coalesced: Counter[str] = Counter()
+
+    async def do(self, key: tuple, fn: Callable[[], Awaitable[T]]) -> T:
+        # чтение из primary после записи не должно получить результат чтения из реплики
+        key = (*key, prefer_primary.get())
+        task = self._calls.get(key)
+        if task is None:
+            self.leaders[key[0]] += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced[key[0]] += 1
+        # отмена одного ожидающего не отменяет общий запрос для остальных
+        return await asyncio.shield(task)
+
+    def forget(self, kind: str, *args: Hashable):
+        """
+        После записи новые чтения не присоединяются к запросам, начатым до неё.
+        Без args забываются все ключи этого вида
+        """
+        for key in [key for key in self._calls if key[0] == kind and key[1:1 + len(args)] == args]:
+            del self._calls[key]
+
+    def _finish(self, key: tuple, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # исключение уже получили ожидающие, если они были
+            task.exception()
+
+
+user_reads = SingleFlight()
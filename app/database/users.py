@@ -1,73 +1,104 @@
-from typing import Iterable, Type
+from typing import Iterable
 
 from fastapi import HTTPException
-from sqlalchemy import func
+from sqlalchemy import delete, func, insert, update
 from sqlmodel import Session, select
 
-from app.models.user import UserData, UserCreateData
-from ..database.engine import engine
+from app.database.cache import user_cache
+from app.database.counters import CountStrategy, estimate_statement, users_count
+from app.models.user import UserData, UserCreateData, utcnow
+from ..database.engine import get_engine, get_read_router
 
 
 def get_user(user_id: int) -> UserData | None:
-    with Session(engine) as session:
-        return session.get(UserData, user_id)
+    found, user = user_cache.get(user_id)
+    if found:
+        return user
+    generation = user_cache.generation()
+    user = get_read_router().run(lambda session: session.get(UserData, user_id))
+    user_cache.set(user_id, user, generation)
+    return user
 
 
 def get_users() -> Iterable[UserData]:
-    with Session(engine) as session:
-        statement = select(UserData)
-        return session.exec(statement).all()
+    statement = select(UserData)
+    return get_read_router().run(lambda session: session.exec(statement).all())
 
 
-def count_users():
-    with Session(engine) as session:
-        return session.exec(func.count(UserData.id)).scalar()
+def count_users(strategy: CountStrategy = CountStrategy.EXACT) -> int:
+    """
+    Количество пользователей: точное, точное из кэша процесса или оценка по статистике БД
+    """
+    if strategy == CountStrategy.CACHED:
+        cached = users_count.get()
+        if cached is not None:
+            return cached
+    if strategy == CountStrategy.ESTIMATE:
+        statement = estimate_statement(get_engine().dialect.name)
+        estimate = get_read_router().run(lambda session: session.execute(statement).scalar())
+        if estimate is not None and estimate >= 0:
+            return estimate
+    total = get_read_router().run(lambda session: session.exec(func.count(UserData.id)).scalar())
+    users_count.set(total)
+    return total
 
 
 def create_user(user: UserData) -> UserData:
-    with Session(engine) as session:
-        session.add(user)
+    """
+    Создание пользователя одним INSERT ... RETURNING
+    """
+    statement = insert(UserData).values(**user.model_dump(exclude_none=True)).returning(UserData)
+    with Session(get_engine(), expire_on_commit=False) as session:
+        new_user = session.scalars(statement).one()
         session.commit()
-        session.refresh(user)
-        return user
+    users_count.add(1)
+    user_cache.invalidate(new_user.id)
+    return new_user
 
 
 def create_user_from_api_request(user: UserCreateData) -> UserData:
     """
     Создание пользователя в БД, с моделью по API
     """
-    with Session(engine) as session:
-        new_user = UserData(email='', first_name=user.name, last_name='', avatar='', job=user.job)
+    return create_user(UserData(email='', first_name=user.name, last_name='', avatar='', job=user.job))
 
-        return create_user(new_user)
 
-
-def update_user(user_id: int, user: UserCreateData) -> Type[UserData]:
-    with Session(engine) as session:
-        db_user = session.get(UserData, user_id)
-        if not db_user:
-            raise HTTPException(status_code=404, detail="User not found")
-        db_user.first_name = user.name
-        db_user.job = user.job
+def update_user(user_id: int, user: UserCreateData) -> UserData:
+    """
+    Обновление пользователя одним UPDATE ... RETURNING, 404 если строка не найдена
+    """
+    statement = (update(UserData).where(UserData.id == user_id)
+                 .values(first_name=user.name, job=user.job, updated_at=utcnow(), version=UserData.version + 1)
+                 .returning(UserData).execution_options(synchronize_session=False))
+    with Session(get_engine(), expire_on_commit=False) as session:
+        db_user = session.scalars(statement).one_or_none()
         session.commit()
-        session.refresh(db_user)
-        return db_user
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    user_cache.invalidate(user_id)
+    return db_user
 
 
 def delete_user(user_id: int):
-    with Session(engine) as session:
-        user = session.get(UserData, user_id)
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        session.delete(user)
+    """
+    Удаление пользователя одним DELETE ... RETURNING id, 404 если строка не найдена
+    """
+    statement = (delete(UserData).where(UserData.id == user_id).returning(UserData.id)
+                 .execution_options(synchronize_session=False))
+    with Session(get_engine()) as session:
+        deleted_id = session.scalars(statement).one_or_none()
         session.commit()
+    if deleted_id is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    users_count.add(-1)
+    user_cache.invalidate(user_id)
 
 
 def get_max_user_id() -> int:
     """
     Получение текущего максимального id по таблице пользователей
     """
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         max_id = session.exec(func.max(UserData.id)).scalar()
 
         return max_id
@@ -1,31 +1,56 @@
+import asyncio
+import functools
 import os
 from contextlib import asynccontextmanager
 
-import dotenv
-
-dotenv.load_dotenv()
-
-from app.database.users import create_user
-from app.database.data import users_data
-
-dotenv.load_dotenv()
-from urllib.parse import urlparse
-import uvicorn
-
-from app.database.engine import create_db_and_tables
-
 from fastapi import FastAPI
 from fastapi_pagination import add_pagination
 
-from app.routers import status, users
+from app.database.batching import user_creates
+from app.database.engine import (APP_WORKERS, get_async_engine, get_async_replica_engine, get_engine,
+                                 get_replica_engine, replica_configured)
+from app.database.routing import ReadYourWritesMiddleware
+from app.database.seed import seed_database
+from app.monitoring.admission import ADMISSION_CONTROL_ENABLED, AdmissionMiddleware, admission_limiters
+from app.monitoring.health import database_prober
+from app.monitoring.leaks import connection_leaks
+from app.monitoring.metrics import METRICS_ENABLED, MetricsMiddleware, instrument_engine, monitor_event_loop_lag
+from app.monitoring.profiling import PROFILING_ENABLED, ProfilingMiddleware, request_profiler
+from app.monitoring.slow_queries import SLOW_QUERY_LOG_ENABLED, slow_query_log
+from app.routers import metrics, profiling, status, users
+from app.routers.compression import COMPRESSION_ENABLED, CompressionMiddleware, available_compressors
+
+
+@functools.cache
+def instrument_engines():
+    """
+    Подключение наблюдения к движкам БД. Выполняется при старте, а не при импорте: движки создаются лениво
+    """
+    engines = {'sync': get_engine(), 'async': get_async_engine().sync_engine}
+    if replica_configured():
+        engines.update(replica_sync=get_replica_engine(), replica_async=get_async_replica_engine().sync_engine)
+    for name, engine in engines.items():
+        connection_leaks.track(engine, name)
+        if METRICS_ENABLED:
+            instrument_engine(engine, name)
+        if SLOW_QUERY_LOG_ENABLED:
+            slow_query_log.instrument(engine, name)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    create_db_and_tables()
-    for user in users_data.values():
-        create_user(user)
+    instrument_engines()
+    seed_database()
+    user_creates.start()
+    await database_prober.start()
+    lag_monitor = asyncio.create_task(monitor_event_loop_lag()) if METRICS_ENABLED else None
+    leak_monitor = asyncio.create_task(connection_leaks.monitor())
     yield
+    await user_creates.drain()
+    leak_monitor.cancel()
+    if lag_monitor is not None:
+        lag_monitor.cancel()
+    await database_prober.stop()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -33,6 +58,31 @@ app.include_router(status.router)
 app.include_router(users.router)
 add_pagination(app)
 
+# сжатие - самый внутренний слой: метрики и профили учитывают его время
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware, compressors=available_compressors())
+
+if replica_configured():
+    app.add_middleware(ReadYourWritesMiddleware)
+
+if ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(AdmissionMiddleware, limiters=admission_limiters)
+
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics.router)
+
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, profiler=request_profiler)
+
+if PROFILING_ENABLED or SLOW_QUERY_LOG_ENABLED:
+    app.include_router(profiling.router)
+
 if __name__ == "__main__":
+    # uvicorn нужен только при запуске через python -m app.main, fastapi run импортирует его сам
+    from urllib.parse import urlparse
+
+    import uvicorn
+
     parsed_app_url = urlparse(os.getenv('APP_URL'))
-    uvicorn.run(app, host=parsed_app_url.hostname, port=parsed_app_url.port)
+    uvicorn.run('app.main:app', host=parsed_app_url.hostname, port=parsed_app_url.port, workers=APP_WORKERS)
@@ -1,6 +1,68 @@
+from datetime import datetime
+
 from pydantic import BaseModel
 
 
 class AppStatus(BaseModel):
     database: bool
     status: str
+    checked_at: datetime | None = None
+    stale: bool = False
+
+
+class PoolStatus(BaseModel):
+    size: int
+    checked_out: int
+    overflow: int
+    saturation: float
+
+
+class ReadinessStatus(BaseModel):
+    ready: bool
+    database: bool
+    checked_at: datetime | None = None
+    latency_ms: float | None = None
+    stale: bool
+    error: str | None = None
+    pool: PoolStatus | None = None
+
+
+class CacheStats(BaseModel):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    max_size: int
+
+
+class AdmissionStats(BaseModel):
+    limit: int
+    in_flight: int
+    queue_size: int
+    waiting: int
+    admitted: int
+    rejected: int
+    timed_out: int
+
+
+class SlowQuery(BaseModel):
+    engine: str
+    statement: str
+    parameters: str
+    duration_ms: float
+    bind_ms: float | None = None
+    route: str | None = None
+    operation: str | None = None
+    plan: list[str] | None = None
+    recorded_at: datetime
+
+
+class RequestProfile(BaseModel):
+    id: int
+    method: str
+    path: str
+    status: int
+    duration_ms: float
+    sampled: bool
+    recorded_at: datetime
+    summary: str
@@ -0,0 +1,41 @@
+import base64
+import binascii
+import os
+
+from fastapi import Query
+from fastapi_pagination import Page
+from fastapi_pagination.customization import CustomizedPage, UseParamsFields
+from pydantic import BaseModel, ValidationError
+
+from app.models.user import PublicUserData
+
+USERS_PAGE_MAX_SIZE = int(os.getenv('USERS_PAGE_MAX_SIZE', 100))
+
+# Page[PublicUserData] с тем же size по умолчанию, верхняя граница size настраивается (у fastapi-pagination - 100)
+UsersPage = CustomizedPage[Page[PublicUserData], UseParamsFields(size=Query(50, ge=1, le=USERS_PAGE_MAX_SIZE))]
+
+
+class Cursor(BaseModel):
+    """
+    Позиция в keyset-пагинации: id крайнего пользователя и направление обхода
+    """
+    id: int
+    backwards: bool = False
+
+    def encode(self) -> str:
+        return base64.urlsafe_b64encode(self.model_dump_json().encode()).decode().rstrip('=')
+
+    @classmethod
+    def decode(cls, value: str) -> 'Cursor':
+        try:
+            raw = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+            return cls.model_validate_json(raw)
+        except (binascii.Error, ValueError, ValidationError) as e:
+            raise ValueError('Invalid cursor') from e
+
+
+class CursorPage(BaseModel):
+    items: list[PublicUserData]
+    size: int
+    next: str | None = None
+    previous: str | None = None
@@ -1,10 +1,21 @@
+from datetime import datetime, timezone
+from typing import Literal
+
 from pydantic import BaseModel
+from sqlalchemy import DateTime, Index, func
 from sqlmodel import SQLModel, Field
 
 from app.models.support import SupportData
 
 
-class UserData(SQLModel, table=True):
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class PublicUserData(SQLModel):
+    """
+    Пользователь в ответах API (формат reqres): без служебных колонок версии
+    """
     id: int | None = Field(default=None, primary_key=True)
     email: str
     first_name: str
@@ -13,8 +24,42 @@ class UserData(SQLModel, table=True):
     job: str
 
 
+class UserData(PublicUserData, table=True):
+    # время последнего изменения и номер версии строки, их обновляют пути записи; по ним строятся ETag и Last-Modified
+    updated_at: datetime = Field(default_factory=utcnow, sa_type=DateTime(timezone=True))
+    version: int = Field(default=1)
+
+
+# поля ответов API; updated_at и version отдаются только через ETag и Last-Modified
+USER_FIELDS = tuple(PublicUserData.model_fields)
+# колонки, по которым строятся ETag и Last-Modified: выбираются при любом наборе полей fields=
+VALIDATOR_FIELDS = ('id', 'version', 'updated_at')
+
+
+# email уникален только среди заполненных: пользователи из POST /api/users/ создаются с пустым email
+Index('uq_userdata_email', UserData.email, unique=True,
+      postgresql_where=UserData.email != '', sqlite_where=UserData.email != '')
+# префиксный поиск без учёта регистра идёт по lower(...); text_pattern_ops позволяет Postgres
+# использовать индекс для LIKE 'prefix%' при любой локали БД, SQLite берёт индекс для диапазона
+Index('ix_userdata_first_name_lower', func.lower(UserData.first_name).label('first_name_lower'),
+      postgresql_ops={'first_name_lower': 'text_pattern_ops'})
+Index('ix_userdata_last_name_lower', func.lower(UserData.last_name).label('last_name_lower'),
+      postgresql_ops={'last_name_lower': 'text_pattern_ops'})
+Index('ix_userdata_job', UserData.job)
+
+
+class UserFilter(BaseModel):
+    email: str | None = None
+    first_name: str | None = None
+    last_name: str | None = None
+    job: str | None = None
+
+    def is_empty(self) -> bool:
+        return not any(value is not None for value in self.model_dump().values())
+
+
 class UserResponse(BaseModel):
-    data: UserData
+    data: PublicUserData
     support: SupportData
 
 
@@ -34,3 +79,25 @@ class UserUpdatedResponse(BaseModel):
     name: str | None = None
     job: str | None = None
     updatedAt: str
+
+
+class UserBatchUpdateData(UserCreateData):
+    id: int
+
+
+class UserBatchItemResult(BaseModel):
+    id: int
+    status: int
+    data: PublicUserData | None = None
+    detail: str | None = None
+
+
+class UserBatchResponse(BaseModel):
+    items: list[UserBatchItemResult]
+
+
+class UserChange(BaseModel):
+    id: int
+    type: Literal['created', 'updated', 'deleted']
+    user_id: int
+    data: PublicUserData | None = None
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import os
+from collections import deque
+from http import HTTPStatus
+
+from fastapi.responses import JSONResponse
+
+from app.database.engine import worker_pool_size
+from app.models.app import AdmissionStats
+
+# max_overflow пула SQLAlchemy по умолчанию: столько соединений пул открывает сверх DATABASE_POOL_SIZE
+DATABASE_POOL_OVERFLOW = 10
+
+ADMISSION_CONTROL_ENABLED = os.getenv('ADMISSION_CONTROL_ENABLED', 'true').lower() == 'true'
+ADMISSION_READS_LIMIT = int(os.getenv('ADMISSION_READS_LIMIT', worker_pool_size() + DATABASE_POOL_OVERFLOW))
+ADMISSION_WRITES_LIMIT = int(os.getenv('ADMISSION_WRITES_LIMIT', worker_pool_size()))
+ADMISSION_STATUS_LIMIT = int(os.getenv('ADMISSION_STATUS_LIMIT', 20))
+ADMISSION_QUEUE_SIZE = int(os.getenv('ADMISSION_QUEUE_SIZE', 100))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 1))
+ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', 1))
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionLimiter:
+    """
+    Ограничение одновременных запросов группы: limit выполняются, до queue_size ждут в очереди FIFO
+    не дольше timeout секунд. Сверх очереди и по истечении ожидания запрос отклоняется сразу
+    """
+
+    def __init__(self, limit: int, queue_size: int, timeout: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> bool:
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.queue_size:
+            self.rejected += 1
+            return False
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            # слот мог быть передан в том же такте, что и истечение ожидания: без возврата он занят навсегда
+            if future.done() and not future.cancelled():
+                self.release()
+            return False
+        except asyncio.CancelledError:
+            # слот мог быть передан одновременно с отменой запроса клиентом
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            if not future.done() or future.cancelled():
+                self._remove(future)
+        self.admitted += 1
+        return True
+
+    def release(self):
+        # слот передаётся первому ожидающему, in_flight не меняется
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _remove(self, future: asyncio.Future):
+        try:
+            self._waiters.remove(future)
+        except ValueError:
+            pass
+
+    def stats(self) -> AdmissionStats:
+        return AdmissionStats(limit=self.limit, in_flight=self.in_flight, queue_size=self.queue_size,
+                              waiting=len(self._waiters), admitted=self.admitted, rejected=self.rejected,
+                              timed_out=self.timed_out)
+
+
+def route_group(method: str, path: str) -> str | None:
+    """
+    Группа ограничения по запросу: reads и writes для /api/users, status для проб и метрик.
+    Поток изменений не ограничивается: он долгий и не занимает соединение БД
+    """
+    if path.startswith('/api/users/changes'):
+        return None
+    if path.startswith('/api/users'):
+        return 'reads' if method in ('GET', 'HEAD') else 'writes'
+    if path.startswith(('/status', '/health', '/metrics')):
+        return 'status'
+    return None
+
+
+class AdmissionMiddleware:
+    """
+    ASGI-middleware перед пулом соединений: при превышении лимита группы запрос сразу получает 503
+    с Retry-After, а не ждёт соединение до таймаута пула
+    """
+
+    def __init__(self, app, limiters: dict[str, AdmissionLimiter], retry_after: int = ADMISSION_RETRY_AFTER):
+        self.app = app
+        self.limiters = limiters
+        self.retry_after = retry_after
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        group = route_group(scope['method'], scope['path'])
+        limiter = self.limiters.get(group)
+        if limiter is None:
+            return await self.app(scope, receive, send)
+
+        if not await limiter.acquire():
+            logger.warning('Request %s %s shed, %s group is over capacity', scope['method'], scope['path'], group)
+            response = JSONResponse(status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                                    content={'detail': 'Service is over capacity'},
+                                    headers={'Retry-After': str(self.retry_after)})
+            return await response(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+
+admission_limiters = {
+    'reads': AdmissionLimiter(ADMISSION_READS_LIMIT, ADMISSION_QUEUE_SIZE, ADMISSION_QUEUE_TIMEOUT),
+    'writes': AdmissionLimiter(ADMISSION_WRITES_LIMIT, ADMISSION_QUEUE_SIZE, ADMISSION_QUEUE_TIMEOUT),
+    'status': AdmissionLimiter(ADMISSION_STATUS_LIMIT, ADMISSION_QUEUE_SIZE, ADMISSION_QUEUE_TIMEOUT),
+}
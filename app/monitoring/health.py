@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from time import perf_counter
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.database.engine import async_check_availability, get_async_engine
+from app.models.app import PoolStatus, ReadinessStatus
+
+HEALTH_CHECK_INTERVAL = float(os.getenv('HEALTH_CHECK_INTERVAL', 5))
+HEALTH_CHECK_TIMEOUT = float(os.getenv('HEALTH_CHECK_TIMEOUT', 2))
+
+logger = logging.getLogger(__name__)
+
+
+def pool_status(engine: AsyncEngine) -> PoolStatus | None:
+    """
+    Заполненность пула соединений; None для пулов без счётчиков (NullPool, StaticPool у SQLite)
+    """
+    pool = engine.sync_engine.pool
+    if not hasattr(pool, 'checkedout'):
+        return None
+    size, checked_out = pool.size(), pool.checkedout()
+    return PoolStatus(size=size, checked_out=checked_out, overflow=max(pool.overflow(), 0),
+                      saturation=round(checked_out / size, 3) if size else 0.0)
+
+
+class DatabaseProber:
+    """
+    Фоновая проверка БД раз в interval секунд. Пробы /status и /health/ready отдают последний результат
+    из памяти и не занимают соединение из пула на каждый запрос
+    """
+
+    def __init__(self, interval: float, timeout: float, engine: AsyncEngine | None = None):
+        # без engine заполненность пула берётся у основного движка, созданного к моменту проверки
+        self.engine = engine
+        self.interval = interval
+        self.timeout = timeout
+        self.available = False
+        self.checked_at: datetime | None = None
+        self.latency: float | None = None
+        self.error: str | None = None
+        self._task: asyncio.Task | None = None
+
+    async def probe(self):
+        start = perf_counter()
+        try:
+            self.available = await asyncio.wait_for(async_check_availability(), self.timeout)
+            self.error = None if self.available else 'Database is not available'
+        except asyncio.TimeoutError:
+            logger.warning('Database probe timed out after %ss', self.timeout)
+            self.available = False
+            self.error = f'Timed out after {self.timeout}s'
+        self.latency = perf_counter() - start
+        self.checked_at = datetime.now(timezone.utc)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.probe()
+
+    async def start(self):
+        await self.probe()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    @property
+    def stale(self) -> bool:
+        if self.checked_at is None:
+            return True
+        age = (datetime.now(timezone.utc) - self.checked_at).total_seconds()
+        return age > 2 * self.interval + self.timeout
+
+    def readiness(self) -> ReadinessStatus:
+        stale = self.stale
+        return ReadinessStatus(ready=self.available and not stale, database=self.available,
+                               checked_at=self.checked_at,
+                               latency_ms=round(self.latency * 1000, 3) if self.latency is not None else None,
+                               stale=stale, error=self.error, pool=pool_status(self.engine or get_async_engine()))
+
+
+database_prober = DatabaseProber(HEALTH_CHECK_INTERVAL, HEALTH_CHECK_TIMEOUT)
@@ -0,0 +1,65 @@
+import asyncio
+import logging
+import os
+import time
+
+from sqlalchemy import Engine, event
+
+from app.database.sessions import request_sessions
+
+DB_LEAK_THRESHOLD = float(os.getenv('DB_LEAK_THRESHOLD', 30))
+DB_LEAK_CHECK_INTERVAL = float(os.getenv('DB_LEAK_CHECK_INTERVAL', 5))
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionLeakTracker:
+    """
+    Выдачи соединений из пула: когда и каким запросом соединение взято. Соединение, не возвращённое
+    дольше threshold секунд, логируется как возможная утечка один раз
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self.leaks = 0
+        self._checkouts: dict[int, tuple[str, float, str]] = {}
+        self._reported: set[int] = set()
+
+    def track(self, engine: Engine, name: str):
+        # события на движке переносятся и на пул, пересозданный после engine.dispose()
+        @event.listens_for(engine, 'checkout')
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            scope = request_sessions.get()
+            self._checkouts[id(connection_record)] = (name, time.monotonic(), scope.label if scope else 'background')
+
+        @event.listens_for(engine, 'checkin')
+        def on_checkin(dbapi_connection, connection_record):
+            self._checkouts.pop(id(connection_record), None)
+            self._reported.discard(id(connection_record))
+
+    @property
+    def checked_out(self) -> int:
+        return len(self._checkouts)
+
+    def check(self) -> int:
+        """
+        Проверка удерживаемых соединений, возвращает количество новых подозрений на утечку
+        """
+        now = time.monotonic()
+        found = 0
+        for key, (name, since, label) in list(self._checkouts.items()):
+            held = now - since
+            if held > self.threshold and key not in self._reported:
+                self._reported.add(key)
+                found += 1
+                logger.warning('Connection from %s pool held for %.1fs by %s, possible leak', name, held, label)
+        self.leaks += found
+        return found
+
+    async def monitor(self, interval: float = DB_LEAK_CHECK_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            self.check()
+
+
+connection_leaks = ConnectionLeakTracker(DB_LEAK_THRESHOLD)
@@ -0,0 +1,211 @@
+import asyncio
+import os
+from time import perf_counter
+
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import Engine, event
+from sqlalchemy.pool import Pool
+
+from app.database.cache import user_cache
+from app.database.changes import user_changes
+from app.database.singleflight import user_reads
+from app.monitoring.admission import admission_limiters
+from app.monitoring.leaks import connection_leaks
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+EVENT_LOOP_LAG_INTERVAL = float(os.getenv('EVENT_LOOP_LAG_INTERVAL', 0.5))
+
+HTTP_REQUESTS = Counter('http_requests_total', 'HTTP requests', ['method', 'route', 'status'])
+HTTP_REQUEST_DURATION = Histogram('http_request_duration_seconds', 'HTTP request latency', ['method', 'route'])
+DB_STATEMENT_DURATION = Histogram('db_statement_duration_seconds', 'SQL statement execution time',
+                                  ['engine', 'operation'],
+                                  buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5))
+DB_POOL_WAIT = Histogram('db_pool_wait_seconds', 'Time spent waiting for a pooled connection', ['engine'],
+                         buckets=(.0001, .0005, .001, .005, .01, .05, .1, .5, 1, 5, 30))
+EVENT_LOOP_LAG = Gauge('event_loop_lag_seconds', 'Last measured event loop scheduling delay')
+EVENT_LOOP_LAG_HISTOGRAM = Histogram('event_loop_lag_distribution_seconds', 'Event loop scheduling delay',
+                                     buckets=(.001, .005, .01, .025, .05, .1, .25, .5, 1, 2.5))
+
+SQL_OPERATIONS = {'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH'}
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: количество и длительность запросов по шаблону маршрута (/api/users/{user_id}),
+    а не по фактическому пути, чтобы число временных рядов не росло с количеством id
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get('route')
+            path = route.path if route is not None else 'unmatched'
+            HTTP_REQUEST_DURATION.labels(scope['method'], path).observe(perf_counter() - start)
+            HTTP_REQUESTS.labels(scope['method'], path, status).inc()
+
+
+def instrument_engine(engine: Engine, name: str):
+    """
+    Замер времени SQL-выражений через события движка и времени ожидания соединения из пула
+    """
+    statement_duration = {operation: DB_STATEMENT_DURATION.labels(name, operation)
+                          for operation in SQL_OPERATIONS | {'OTHER'}}
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append(perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - conn.info['metrics_query_start'].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper()
+        statement_duration.get(operation, statement_duration['OTHER']).observe(elapsed)
+
+    instrument_pool_wait(engine.pool, name)
+    pool_collector.engines[name] = engine
+
+
+def instrument_pool_wait(pool: Pool, name: str):
+    # у пула нет события "до выдачи соединения", поэтому оборачиваем _do_get этого экземпляра;
+    # после engine.dispose() пул пересоздаётся и ожидание перестаёт замеряться
+    do_get = pool._do_get
+    pool_wait = DB_POOL_WAIT.labels(name)
+
+    def timed_do_get():
+        start = perf_counter()
+        try:
+            return do_get()
+        finally:
+            pool_wait.observe(perf_counter() - start)
+
+    pool._do_get = timed_do_get
+
+
+class PoolCollector:
+    """
+    Состояние пулов соединений на момент сбора метрик: размер (DATABASE_POOL_SIZE), занятые, overflow
+    """
+
+    def __init__(self):
+        self.engines: dict[str, Engine] = {}
+
+    def collect(self):
+        gauges = {
+            'size': GaugeMetricFamily('db_pool_size', 'Configured pool size', labels=['engine']),
+            'checked_out': GaugeMetricFamily('db_pool_checked_out', 'Connections currently checked out',
+                                             labels=['engine']),
+            'checked_in': GaugeMetricFamily('db_pool_checked_in', 'Idle connections in the pool', labels=['engine']),
+            'overflow': GaugeMetricFamily('db_pool_overflow', 'Connections opened above pool size',
+                                          labels=['engine']),
+        }
+        for name, engine in self.engines.items():
+            pool = engine.pool
+            if not hasattr(pool, 'checkedout'):
+                continue
+            gauges['size'].add_metric([name], pool.size())
+            gauges['checked_out'].add_metric([name], pool.checkedout())
+            gauges['checked_in'].add_metric([name], pool.checkedin())
+            gauges['overflow'].add_metric([name], max(pool.overflow(), 0))
+        yield from gauges.values()
+        leaks = CounterMetricFamily('db_connection_leaks', 'Connections held past DB_LEAK_THRESHOLD')
+        leaks.add_metric([], connection_leaks.leaks)
+        yield leaks
+
+
+class UserCacheCollector:
+    def collect(self):
+        stats = user_cache.stats()
+        for name, value in (('hits', stats.hits), ('misses', stats.misses), ('evictions', stats.evictions)):
+            counter = CounterMetricFamily(f'user_cache_{name}', f'User cache {name}')
+            counter.add_metric([], value)
+            yield counter
+        size = GaugeMetricFamily('user_cache_size', 'Entries in the user cache')
+        size.add_metric([], stats.size)
+        yield size
+
+
+class SingleFlightCollector:
+    """
+    Чтения, выполненные в БД (leaders), и запросы, получившие результат уже идущего чтения (coalesced)
+    """
+
+    def collect(self):
+        for name, counts in (('leaders', user_reads.leaders), ('coalesced', user_reads.coalesced)):
+            counter = CounterMetricFamily(f'user_reads_{name}', f'User reads {name} by single-flight',
+                                          labels=['kind'])
+            for kind, value in counts.items():
+                counter.add_metric([kind], value)
+            yield counter
+
+
+class ChangeFeedCollector:
+    def collect(self):
+        subscribers = GaugeMetricFamily('user_changes_subscribers', 'Open change feed streams')
+        subscribers.add_metric([], user_changes.subscribers)
+        yield subscribers
+        dropped = CounterMetricFamily('user_changes_dropped', 'Change feed subscribers dropped as too slow')
+        dropped.add_metric([], user_changes.dropped)
+        yield dropped
+
+
+class AdmissionCollector:
+    """
+    Лимиты и заполненность групп admission control: выполняющиеся и ожидающие запросы, отклонённые
+    """
+
+    def collect(self):
+        gauges = {
+            'limit': GaugeMetricFamily('admission_limit', 'Concurrent requests allowed', labels=['group']),
+            'in_flight': GaugeMetricFamily('admission_in_flight', 'Requests being served', labels=['group']),
+            'waiting': GaugeMetricFamily('admission_queue_depth', 'Requests waiting for a slot', labels=['group']),
+        }
+        counters = {
+            'rejected': CounterMetricFamily('admission_rejected', 'Requests shed with a full queue',
+                                            labels=['group']),
+            'timed_out': CounterMetricFamily('admission_timed_out', 'Requests shed after the queue deadline',
+                                             labels=['group']),
+        }
+        for group, limiter in admission_limiters.items():
+            stats = limiter.stats()
+            for name, metric in (*gauges.items(), *counters.items()):
+                metric.add_metric([group], getattr(stats, name))
+        yield from gauges.values()
+        yield from counters.values()
+
+
+async def monitor_event_loop_lag(interval: float = EVENT_LOOP_LAG_INTERVAL):
+    """
+    Фоновая задача: насколько позже запланированного просыпается sleep(interval)
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(loop.time() - start - interval, 0.0)
+        EVENT_LOOP_LAG.set(lag)
+        EVENT_LOOP_LAG_HISTOGRAM.observe(lag)
+
+
+pool_collector = PoolCollector()
+REGISTRY.register(pool_collector)
+REGISTRY.register(UserCacheCollector())
+REGISTRY.register(SingleFlightCollector())
+REGISTRY.register(AdmissionCollector())
+REGISTRY.register(ChangeFeedCollector())
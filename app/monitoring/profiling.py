@@ -0,0 +1,112 @@
+import cProfile
+import hmac
+import io
+import itertools
+import logging
+import os
+import pstats
+import random
+from collections import deque
+from datetime import datetime, timezone
+from time import perf_counter
+
+from app.models.app import RequestProfile
+
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+PROFILING_TOKEN = os.getenv('PROFILING_TOKEN', '')
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_TOP = int(os.getenv('PROFILING_TOP', 30))
+PROFILING_HISTORY = int(os.getenv('PROFILING_HISTORY', 50))
+PROFILE_HEADER = b'x-profile'
+
+logger = logging.getLogger(__name__)
+
+
+class RequestProfiler:
+    """
+    Профили отдельных запросов: cProfile на время запроса, сводка - функции по суммарному времени
+    с вызываемыми ими. Хранятся последние history профилей
+    """
+
+    def __init__(self, token: str, sample_rate: float, top: int, history: int):
+        self.token = token
+        self.sample_rate = sample_rate
+        self.top = top
+        self.profiles: deque[RequestProfile] = deque(maxlen=history)
+        self._ids = itertools.count(1)
+        self._active = False
+
+    def authorized(self, value: str | None) -> bool:
+        if not self.token or value is None:
+            return False
+        # сравнение за постоянное время, байтами: compare_digest не принимает не-ASCII строки
+        return hmac.compare_digest(value.encode(), self.token.encode())
+
+    def get(self, profile_id: int) -> RequestProfile | None:
+        return next((profile for profile in self.profiles if profile.id == profile_id), None)
+
+    def start(self, requested: bool) -> tuple[int, cProfile.Profile] | None:
+        # профилировщик в потоке один: пока идёт профиль, другие запросы не профилируются
+        if self._active or not (requested or random.random() < self.sample_rate):
+            return None
+        self._active = True
+        profile = cProfile.Profile()
+        profile.enable()
+        return next(self._ids), profile
+
+    def stop(self, profile_id: int, profile: cProfile.Profile, method: str, path: str, status: int,
+             duration: float, sampled: bool) -> RequestProfile:
+        profile.disable()
+        self._active = False
+        output = io.StringIO()
+        stats = pstats.Stats(profile, stream=output).sort_stats(pstats.SortKey.CUMULATIVE)
+        stats.print_stats(self.top)
+        stats.print_callees(self.top)
+        report = RequestProfile(id=profile_id, method=method, path=path, status=status,
+                                duration_ms=round(duration * 1000, 3), sampled=sampled,
+                                recorded_at=datetime.now(timezone.utc), summary=output.getvalue())
+        self.profiles.append(report)
+        logger.info('Request %s %s profiled as #%s, %.1fms', method, path, report.id, report.duration_ms)
+        return report
+
+
+class ProfilingMiddleware:
+    """
+    ASGI-middleware: запрос с заголовком X-Profile: <PROFILING_TOKEN> профилируется всегда, остальные -
+    с вероятностью PROFILING_SAMPLE_RATE. Ответ профилированного запроса содержит X-Profile-Id,
+    сводка доступна по GET /status/profiles/{id}. Профиль охватывает весь поток, поэтому в него
+    попадают и одновременно идущие запросы
+    """
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        header = next((value.decode('latin-1') for name, value in scope['headers'] if name == PROFILE_HEADER), None)
+        requested = self.profiler.authorized(header)
+        started = self.profiler.start(requested)
+        if started is None:
+            return await self.app(scope, receive, send)
+
+        profile_id, profile = started
+        status = 500
+
+        async def send_with_profile_id(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                message['headers'] = [*message.get('headers', []), (b'x-profile-id', str(profile_id).encode())]
+            await send(message)
+
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            self.profiler.stop(profile_id, profile, scope['method'], scope['path'], status,
+                               perf_counter() - start, sampled=not requested)
+
+
+request_profiler = RequestProfiler(PROFILING_TOKEN, PROFILING_SAMPLE_RATE, PROFILING_TOP, PROFILING_HISTORY)
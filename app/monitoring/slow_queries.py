@@ -0,0 +1,125 @@
+import functools
+import logging
+import os
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Awaitable, Callable, TypeVar
+
+from sqlalchemy import Engine, event
+
+from app.database.sessions import request_sessions
+from app.models.app import SlowQuery
+
+SLOW_QUERY_LOG_ENABLED = os.getenv('SLOW_QUERY_LOG_ENABLED', 'false').lower() == 'true'
+SLOW_QUERY_THRESHOLD = float(os.getenv('SLOW_QUERY_THRESHOLD', 100))
+SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', 'false').lower() == 'true'
+SLOW_QUERY_LOG_SIZE = int(os.getenv('SLOW_QUERY_LOG_SIZE', 100))
+# параметры в записи обрезаются, чтобы пакетный INSERT не занял весь лог
+SLOW_QUERY_MAX_PARAMETERS = 1000
+
+EXPLAIN_PREFIXES = {'postgresql': 'EXPLAIN ', 'sqlite': 'EXPLAIN QUERY PLAN '}
+EXPLAINED_STATEMENTS = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+EXPLAIN_SAVEPOINT = 'slow_query_explain'
+
+# хелпер БД, выполняющий запрос (get_users_page, count_users, ...)
+db_operation: ContextVar[str | None] = ContextVar('db_operation', default=None)
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar('F', bound=Callable[..., Awaitable])
+
+
+def tag_queries(fn: F) -> F:
+    """
+    Помечает запросы хелпера его именем в журнале медленных запросов. При выключенном журнале
+    функция не оборачивается
+    """
+    if not SLOW_QUERY_LOG_ENABLED:
+        return fn
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        token = db_operation.set(fn.__name__)
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            db_operation.reset(token)
+
+    return wrapper
+
+
+class SlowQueryLog:
+    """
+    Журнал SQL-выражений дольше threshold мс: параметры, время компиляции и привязки параметров (bind)
+    и выполнения, маршрут и хелпер БД. С explain для них сохраняется план запроса
+    """
+
+    def __init__(self, threshold: float, explain: bool, size: int):
+        self.threshold = threshold / 1000
+        self.explain = explain
+        self.entries: deque[SlowQuery] = deque(maxlen=size)
+
+    def instrument(self, engine: Engine, name: str):
+        @event.listens_for(engine, 'before_execute')
+        def before_execute(conn, clauseelement, multiparams, params, execution_options):
+            conn.info['slow_query_execute_start'] = perf_counter()
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('slow_query_start', []).append(perf_counter())
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            end = perf_counter()
+            start = conn.info['slow_query_start'].pop()
+            if end - start < self.threshold:
+                return
+            execute_start = conn.info.pop('slow_query_execute_start', None)
+            bind = start - execute_start if execute_start is not None and execute_start <= start else None
+            plan = None
+            if self.explain and not executemany and not context.execution_options.get('stream_results'):
+                plan = self._explain(conn, statement, parameters)
+            self._record(name, statement, parameters, end - start, bind, plan)
+
+    def _explain(self, conn, statement: str, parameters) -> list[str] | None:
+        prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+        if prefix is None or not statement.lstrip().upper().startswith(EXPLAINED_STATEMENTS):
+            return None
+        # в Postgres ошибка EXPLAIN прерывает транзакцию запроса: выполняем его в точке сохранения.
+        # SAVEPOINT идёт тем же курсором, а не conn.begin_nested(), чтобы не вызывать события движка из события
+        savepoint = conn.dialect.name == 'postgresql' and conn.in_transaction()
+        # отдельный курсор того же соединения: результаты основного выражения уже получены драйвером
+        cursor = conn.connection.cursor()
+        try:
+            if savepoint:
+                cursor.execute(f'SAVEPOINT {EXPLAIN_SAVEPOINT}')
+            try:
+                cursor.execute(prefix + statement, parameters)
+                plan = [' '.join(str(value) for value in row) for row in cursor.fetchall()]
+            except Exception as e:
+                logger.warning('EXPLAIN failed: %s', e)
+                if savepoint:
+                    cursor.execute(f'ROLLBACK TO SAVEPOINT {EXPLAIN_SAVEPOINT}')
+                plan = None
+            if savepoint:
+                cursor.execute(f'RELEASE SAVEPOINT {EXPLAIN_SAVEPOINT}')
+            return plan
+        finally:
+            cursor.close()
+
+    def _record(self, engine: str, statement: str, parameters, duration: float, bind: float | None,
+                plan: list[str] | None):
+        scope = request_sessions.get()
+        entry = SlowQuery(engine=engine, statement=statement, parameters=repr(parameters)[:SLOW_QUERY_MAX_PARAMETERS],
+                          duration_ms=round(duration * 1000, 3),
+                          bind_ms=round(bind * 1000, 3) if bind is not None else None,
+                          route=scope.endpoint if scope is not None else None, operation=db_operation.get(),
+                          plan=plan, recorded_at=datetime.now(timezone.utc))
+        self.entries.append(entry)
+        logger.warning('Slow query %.1fms on %s [%s %s]: %s', entry.duration_ms, engine, entry.route,
+                       entry.operation, statement)
+
+
+slow_query_log = SlowQueryLog(SLOW_QUERY_THRESHOLD, SLOW_QUERY_EXPLAIN, SLOW_QUERY_LOG_SIZE)
@@ -0,0 +1,195 @@
+"""
+Сжатие ответов по Accept-Encoding: zstd и br, если установлены zstandard и brotli, и gzip из стандартной библиотеки.
+
+Из принятых клиентом кодировок выбирается кодировка с наибольшим q, при равных q - первая в порядке
+COMPRESSION_ENCODINGS. Ответ целиком (без more_body) сжимается, только если он не меньше COMPRESSION_MIN_SIZE байт,
+иначе на сжатие уходит больше времени, чем на передачу сэкономленных байт. Потоковый ответ (большая страница,
+выгрузка) сжимается по частям: каждая часть дожимается flush и сразу уходит клиенту.
+Байты сжатого тела зависят от кодировки, поэтому его ETag получает её суффикс ("1-2+gzip") и остаётся сильным:
+клиент может передать его в If-Match, условные заголовки отбрасывают суффикс (см. conditional).
+"""
+import os
+import zlib
+from http import HTTPStatus
+from typing import Callable, Iterable, Protocol
+
+from starlette.datastructures import MutableHeaders
+
+from .conditional import ENCODING_SEPARATOR
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true'
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_ENCODINGS = os.getenv('COMPRESSION_ENCODINGS', 'zstd,br,gzip')
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv('COMPRESSION_ZSTD_LEVEL', 3))
+COMPRESSION_BROTLI_LEVEL = int(os.getenv('COMPRESSION_BROTLI_LEVEL', 4))
+COMPRESSIBLE_TYPES = {'application/json', 'application/x-ndjson', 'text/csv', 'text/plain'}
+ACCEPT_ENCODING_HEADER = b'accept-encoding'
+
+
+class Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+    def finish(self) -> bytes: ...
+
+
+class GzipCompressor:
+    def __init__(self, level: int = COMPRESSION_GZIP_LEVEL):
+        self._zlib = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._zlib.compress(data)
+
+    def flush(self) -> bytes:
+        return self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._zlib.flush()
+
+
+class ZstdCompressor:
+    def __init__(self, level: int = COMPRESSION_ZSTD_LEVEL):
+        self._zstd = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._zstd.compress(data)
+
+    def flush(self) -> bytes:
+        return self._zstd.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._zstd.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, level: int = COMPRESSION_BROTLI_LEVEL):
+        self._brotli = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._brotli.process(data)
+
+    def flush(self) -> bytes:
+        return self._brotli.flush()
+
+    def finish(self) -> bytes:
+        return self._brotli.finish()
+
+
+def available_compressors(encodings: str = COMPRESSION_ENCODINGS) -> dict[str, Callable[[], Compressor]]:
+    """
+    Кодировки из списка через запятую в порядке предпочтения, без тех, чья библиотека не установлена
+    """
+    installed = {'gzip': GzipCompressor}
+    if zstandard is not None:
+        installed['zstd'] = ZstdCompressor
+    if brotli is not None:
+        installed['br'] = BrotliCompressor
+    names = (name.strip().lower() for name in encodings.split(','))
+    return {name: installed[name] for name in names if name in installed}
+
+
+def negotiate_encoding(accept_encoding: str, encodings: Iterable[str]) -> str | None:
+    """
+    Кодировка ответа по Accept-Encoding (RFC 9110, 12.5.3): наибольший q, при равных - порядок encodings.
+    None - отдать без сжатия
+    """
+    weights = {}
+    for part in accept_encoding.split(','):
+        coding, *params = part.split(';')
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition('=')
+            if name.lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding.strip():
+            weights[coding.strip().lower()] = quality
+    default = weights.get('*', 0.0)
+    accepted = [(weights.get(encoding, default), encoding) for encoding in encodings]
+    quality, encoding = max(accepted, key=lambda item: item[0], default=(0.0, None))
+    return encoding if quality > 0 else None
+
+
+def is_compressible(status: int, headers: MutableHeaders) -> bool:
+    if status < HTTPStatus.OK or status in (HTTPStatus.NO_CONTENT, HTTPStatus.NOT_MODIFIED):
+        return False
+    media_type = headers.get('content-type', '').partition(';')[0].strip().lower()
+    return media_type in COMPRESSIBLE_TYPES and 'content-encoding' not in headers
+
+
+class CompressionMiddleware:
+    """
+    ASGI-middleware сжатия ответов. Ответы с текстовым телом получают Vary: Accept-Encoding и при сжатии
+    ещё Content-Encoding. SSE (text/event-stream) не сжимается: события должны доходить без буферизации
+    """
+
+    def __init__(self, app, compressors: dict[str, Callable[[], Compressor]],
+                 min_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.compressors = compressors
+        self.min_size = min_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] == 'HEAD':
+            return await self.app(scope, receive, send)
+        accept_encoding = next((value.decode('latin-1') for name, value in scope['headers']
+                                if name == ACCEPT_ENCODING_HEADER), '')
+        encoding = negotiate_encoding(accept_encoding, self.compressors)
+        # начало ответа задерживается до первой части тела: по ней решается, сжимать ли ответ
+        pending = None
+        compressor = None
+
+        async def send_compressed(message):
+            nonlocal pending, compressor
+            if message['type'] == 'http.response.start':
+                headers = MutableHeaders(scope=message)
+                if is_compressible(message['status'], headers):
+                    headers.add_vary_header('Accept-Encoding')
+                    if encoding is not None:
+                        pending = message
+                        return
+                return await send(message)
+            if message['type'] != 'http.response.body':
+                return await send(message)
+
+            body, more_body = message.get('body', b''), message.get('more_body', False)
+            if compressor is not None:
+                message['body'] = compressor.compress(body) + (compressor.flush() if more_body else compressor.finish())
+                return await send(message)
+            if pending is None:
+                return await send(message)
+
+            start, pending = pending, None
+            if not more_body and len(body) < self.min_size:
+                await send(start)
+                return await send(message)
+            compressor = self.compressors[encoding]()
+            headers = MutableHeaders(scope=start)
+            headers['Content-Encoding'] = encoding
+            etag = headers.get('etag')
+            if etag is not None and etag.endswith('"'):
+                headers['ETag'] = f'{etag[:-1]}{ENCODING_SEPARATOR}{encoding}"'
+            if more_body:
+                del headers['Content-Length']
+                message['body'] = compressor.compress(body) + compressor.flush()
+            else:
+                message['body'] = compressor.compress(body) + compressor.finish()
+                headers['Content-Length'] = str(len(message['body']))
+            await send(start)
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
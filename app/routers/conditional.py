@@ -0,0 +1,139 @@
+"""
+Условные запросы к ресурсам пользователей.
+
+Сильный ETag пользователя - его id и версия строки, ETag страницы - хэш id и версий её пользователей вместе
+с total/page/size (или курсорами), поэтому любое изменение, добавление или удаление пользователя на странице
+меняет его. Неполное представление (fields=, include_support=false) добавляет к ETag суффикс набора полей.
+Если клиент прислал совпадающий If-None-Match или не устаревший If-Modified-Since, ответ 304 отдаётся
+без сериализации тела. Страницы отдаются без Last-Modified и If-Modified-Since не учитывают:
+удаление пользователя не меняет max(updated_at) оставшихся, а ETag страницы меняет.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from http import HTTPStatus
+from typing import Iterable, NamedTuple, Sequence
+
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+from app.models.user import UserData
+
+# ETag сжатого ответа - ETag тела с кодировкой после разделителя: "1-2+gzip"
+ENCODING_SEPARATOR = '+'
+
+
+def user_etag(user: UserData, variant: str = '') -> str:
+    return f'"{user.id}-{user.version}{variant}"'
+
+
+def representation_variant(fields: tuple[str, ...] | None, include_support: bool = True) -> str:
+    """
+    Суффикс ETag для неполного представления (fields=, include_support=false): разные наборы полей
+    пользователя - разные представления, 304 по ETag одного не должен отдаваться на запрос другого
+    """
+    if fields is None and include_support:
+        return ''
+    payload = orjson.dumps([fields, include_support])
+    return '.' + hashlib.blake2b(payload, digest_size=4).hexdigest()
+
+
+def page_etag(items: Sequence[UserData], *page_fields) -> str:
+    payload = orjson.dumps([list(page_fields), [(user.id, user.version) for user in items]])
+    return f'"{hashlib.blake2b(payload, digest_size=16).hexdigest()}"'
+
+
+def as_utc(value: datetime) -> datetime:
+    # SQLite возвращает время без часового пояса, пути записи сохраняют его в UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def last_modified(items: Iterable[UserData]) -> datetime | None:
+    return max((as_utc(user.updated_at) for user in items), default=None)
+
+
+def format_timestamp(value: datetime) -> str:
+    """
+    Время в формате createdAt/updatedAt ответов: 2025-03-31T12:00:00.000Z
+    """
+    return as_utc(value).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def validator_headers(etag: str, modified: datetime | None) -> dict[str, str]:
+    headers = {'ETag': etag}
+    if modified is not None:
+        headers['Last-Modified'] = format_datetime(modified, usegmt=True)
+    return headers
+
+
+class EntityTag(NamedTuple):
+    value: str
+    weak: bool
+
+
+def parse_etags(header: str) -> list[EntityTag]:
+    """
+    Список ETag из If-Match / If-None-Match с признаком слабого W/"...". Суффикс кодировки сжатого ответа
+    ("1-2+gzip", см. compression) отбрасывается: сжатое и несжатое тело - одна версия пользователя
+    """
+    tags = []
+    for tag in header.split(','):
+        tag = tag.strip()
+        if not tag:
+            continue
+        weak = tag.startswith('W/')
+        tag = tag.removeprefix('W/')
+        if tag != '*':
+            tag = '"' + tag.strip('"').partition(ENCODING_SEPARATOR)[0] + '"'
+        tags.append(EntityTag(tag, weak))
+    return tags
+
+
+def is_not_modified(etag: str, modified: datetime | None, if_none_match: str | None,
+                    if_modified_since: str | None) -> bool:
+    """
+    If-None-Match проверяется первым, If-Modified-Since учитывается только без него (RFC 9110, 13.2.2)
+    """
+    if if_none_match is not None:
+        # слабое сравнение: W/ не учитывается
+        return any(tag.value in ('*', etag) for tag in parse_etags(if_none_match))
+    if if_modified_since is None or modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    # Last-Modified передаётся с точностью до секунды
+    return modified.replace(microsecond=0) <= since
+
+
+def not_modified_response(headers: dict[str, str]) -> Response:
+    return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+
+
+def if_match_versions(user_id: int, if_match: str | None) -> set[int] | None:
+    """
+    Версии пользователя, с которыми клиент разрешает запись. None - без условия (нет заголовка или If-Match: *).
+    If-Match сравнивается строго (RFC 9110, 13.1.1): слабый ETag, ETag другого пользователя или неизвестного
+    формата не совпадает ни с одной версией, запись получит 412
+    """
+    if if_match is None:
+        return None
+    tags = parse_etags(if_match)
+    if any(tag.value == '*' for tag in tags):
+        return None
+    versions = set()
+    for tag in tags:
+        if tag.weak:
+            continue
+        tag_id, _, tag_version = tag.value.strip('"').partition('-')
+        # ETag неполного представления задаёт ту же версию строки
+        tag_version = tag_version.partition('.')[0]
+        if tag_id == str(user_id) and tag_version.isdigit():
+            versions.add(int(tag_version))
+    if not versions:
+        raise HTTPException(status_code=HTTPStatus.PRECONDITION_FAILED, detail="User was modified")
+    return versions
@@ -0,0 +1,36 @@
+from http import HTTPStatus
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.models.app import RequestProfile, SlowQuery
+from app.monitoring.profiling import request_profiler
+from app.monitoring.slow_queries import slow_query_log
+
+router = APIRouter(prefix='/status', include_in_schema=False)
+
+
+def check_token(x_profile: str | None):
+    if not request_profiler.authorized(x_profile):
+        raise HTTPException(status_code=HTTPStatus.FORBIDDEN, detail="Profiling token required")
+
+
+@router.get('/profiles', response_model=list[RequestProfile])
+async def profiles(x_profile: str | None = Header(None)) -> list[RequestProfile]:
+    check_token(x_profile)
+    return [profile.model_copy(update={'summary': ''}) for profile in request_profiler.profiles]
+
+
+@router.get('/profiles/{profile_id}', response_class=PlainTextResponse)
+async def profile(profile_id: int, x_profile: str | None = Header(None)) -> str:
+    check_token(x_profile)
+    report = request_profiler.get(profile_id)
+    if report is None:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Profile not found")
+    return report.summary
+
+
+@router.get('/slow-queries', response_model=list[SlowQuery])
+async def slow_queries(x_profile: str | None = Header(None)) -> list[SlowQuery]:
+    check_token(x_profile)
+    return list(slow_query_log.entries)
@@ -0,0 +1,97 @@
+"""
+Быстрая сериализация ответов пользовательских эндпоинтов.
+
+Хэндлеры возвращают готовый Response, поэтому FastAPI не валидирует его повторно по response_model
+(response_model остаётся для схемы OpenAPI). JSON собирается через orjson в том же компактном виде,
+что и стандартный JSONResponse (json.dumps с ensure_ascii=False и separators=(",", ":")),
+а неизменный блок support закодирован один раз при импорте. Время сериализуется как у pydantic: UTC с суффиксом Z.
+Страница больше USERS_PAGE_STREAM_THRESHOLD пользователей не собирается в один буфер, а отдаётся потоком
+по USERS_PAGE_STREAM_CHUNK пользователей, байты тела те же.
+"""
+import asyncio
+import math
+import os
+from http import HTTPStatus
+from typing import Any, AsyncIterator, Sequence
+
+import orjson
+from fastapi.responses import Response, StreamingResponse
+
+from app.models.pagination import CursorPage
+from app.models.support import support_data
+from app.models.user import USER_FIELDS
+
+SUPPORT_JSON = orjson.dumps(support_data.model_dump())
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+USERS_PAGE_STREAM_THRESHOLD = int(os.getenv('USERS_PAGE_STREAM_THRESHOLD', 1000))
+USERS_PAGE_STREAM_CHUNK = int(os.getenv('USERS_PAGE_STREAM_CHUNK', 500))
+
+
+class JSONBytesResponse(Response):
+    media_type = 'application/json'
+
+
+def user_fields(user, fields: tuple[str, ...] | None) -> dict[str, Any]:
+    """
+    Поля пользователя для ответа: все поля API или только fields (у UserData и у строки проекции)
+    """
+    return {name: getattr(user, name) for name in (USER_FIELDS if fields is None else fields)}
+
+
+def user_response(user, headers: dict[str, str] | None = None, fields: tuple[str, ...] | None = None,
+                  include_support: bool = True) -> Response:
+    body = b'{"data":' + orjson.dumps(user_fields(user, fields), option=ORJSON_OPTIONS)
+    if include_support:
+        body += b',"support":' + SUPPORT_JSON
+    return JSONBytesResponse(body + b'}', headers=headers)
+
+
+async def page_chunks(items: Sequence, fields: tuple[str, ...] | None, rest: dict[str, Any]) -> AsyncIterator[bytes]:
+    """
+    Тело страницы по частям: {"items":[ и пользователи пачками, затем ] и остальные поля страницы (rest)
+    """
+    opening = b'{"items":['
+    for start in range(0, len(items), USERS_PAGE_STREAM_CHUNK):
+        chunk = [user_fields(user, fields) for user in items[start:start + USERS_PAGE_STREAM_CHUNK]]
+        yield opening + orjson.dumps(chunk, option=ORJSON_OPTIONS)[1:-1]
+        opening = b','
+        # сериализация следующей пачки не должна задерживать другие запросы на всю страницу
+        await asyncio.sleep(0)
+    yield (b'' if items else opening) + b'],' + orjson.dumps(rest, option=ORJSON_OPTIONS)[1:]
+
+
+def items_response(items: Sequence, fields: tuple[str, ...] | None, rest: dict[str, Any],
+                   headers: dict[str, str] | None = None) -> Response:
+    """
+    Страница пользователей: items первым полем, за ним rest. Большая страница отдаётся потоком
+    """
+    if len(items) > USERS_PAGE_STREAM_THRESHOLD:
+        return StreamingResponse(page_chunks(items, fields, rest), media_type=JSONBytesResponse.media_type,
+                                 headers=headers)
+    return JSONBytesResponse(orjson.dumps({'items': [user_fields(user, fields) for user in items], **rest},
+                                          option=ORJSON_OPTIONS), headers=headers)
+
+
+def page_response(items: Sequence, total: int, page: int, size: int, headers: dict[str, str] | None = None,
+                  fields: tuple[str, ...] | None = None) -> Response:
+    """
+    Тело Page[PublicUserData]: items, total, page, size, pages - в порядке полей модели fastapi-pagination
+    """
+    pages = math.ceil(total / size) if size else 0
+    return items_response(items, fields, {'total': total, 'page': page, 'size': size, 'pages': pages}, headers)
+
+
+def cursor_page_response(page: CursorPage, headers: dict[str, str] | None = None,
+                         fields: tuple[str, ...] | None = None) -> Response:
+    return items_response(page.items, fields, {'size': page.size, 'next': page.next, 'previous': page.previous},
+                          headers)
+
+
+def created_response(name: str, job: str, user_id: int, created_at: str,
+                     headers: dict[str, str] | None = None) -> Response:
+    return JSONBytesResponse(orjson.dumps({'name': name, 'job': job, 'id': str(user_id), 'createdAt': created_at}),
+                             status_code=HTTPStatus.CREATED, headers=headers)
+
+
+def updated_response(name: str, job: str, updated_at: str, headers: dict[str, str] | None = None) -> Response:
+    return JSONBytesResponse(orjson.dumps({'name': name, 'job': job, 'updatedAt': updated_at}), headers=headers)
@@ -1,13 +1,41 @@
 from http import HTTPStatus
 
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 
-from app.database.engine import check_availability
-from app.models.app import AppStatus
+from app.database.cache import user_cache
+from app.models.app import AdmissionStats, AppStatus, CacheStats, ReadinessStatus
+from app.monitoring.admission import admission_limiters
+from app.monitoring.health import database_prober
 
 router = APIRouter()
 
 
 @router.get('/status', response_model=AppStatus, status_code=HTTPStatus.OK)
 async def status() -> AppStatus:
-    return AppStatus(database=check_availability(), status='App run successful')
+    return AppStatus(database=database_prober.available, status='App run successful',
+                     checked_at=database_prober.checked_at, stale=database_prober.stale)
+
+
+@router.get('/health/live', status_code=HTTPStatus.OK)
+async def liveness() -> dict:
+    return {'status': 'alive'}
+
+
+@router.get('/health/ready', response_model=ReadinessStatus, status_code=HTTPStatus.OK,
+            responses={HTTPStatus.SERVICE_UNAVAILABLE: {"model": ReadinessStatus}})
+async def readiness() -> ReadinessStatus | JSONResponse:
+    report = database_prober.readiness()
+    if not report.ready:
+        return JSONResponse(status_code=HTTPStatus.SERVICE_UNAVAILABLE, content=report.model_dump(mode='json'))
+    return report
+
+
+@router.get('/status/cache', response_model=CacheStats, status_code=HTTPStatus.OK)
+async def cache_status() -> CacheStats:
+    return user_cache.stats()
+
+
+@router.get('/status/admission', response_model=dict[str, AdmissionStats], status_code=HTTPStatus.OK)
+async def admission_status() -> dict[str, AdmissionStats]:
+    return {group: limiter.stats() for group, limiter in admission_limiters.items()}
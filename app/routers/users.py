@@ -1,57 +1,246 @@
-from datetime import datetime
+import csv
+import io
+import os
+from contextlib import aclosing
 from http import HTTPStatus
-from typing import Union
+from typing import Any, AsyncIterator, Literal, Sequence, Union
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
-from fastapi_pagination import Page
-from fastapi_pagination.ext.sqlalchemy import paginate
-from sqlalchemy import select
-from sqlmodel import Session
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi_pagination import resolve_params
 
-from app.database import users
-from app.models.user import UserData, UserResponse, UserCreateData, UserCreateResponse, UserUpdatedResponse
-from ..database.engine import engine
-from ..models.support import support_data
+from app.database import async_users as users
+from app.database.batching import user_creates
+from app.database.changes import USERS_CHANGES_HEARTBEAT, Subscription, user_changes
+from app.database.counters import CountStrategy, USERS_COUNT_STRATEGY
+from app.database.sessions import request_session_scope
+from app.models.pagination import Cursor, CursorPage, UsersPage
+from app.models.user import (USER_FIELDS, UserChange, UserData, UserResponse, UserCreateData, UserCreateResponse,
+                             UserUpdatedResponse, UserBatchUpdateData, UserBatchItemResult, UserBatchResponse,
+                             UserFilter)
+from .conditional import (format_timestamp, if_match_versions, is_not_modified, last_modified, not_modified_response,
+                          page_etag, representation_variant, user_etag, validator_headers)
+from .responses import (ORJSON_OPTIONS, created_response, cursor_page_response, page_response, updated_response,
+                        user_response)
 
-router = APIRouter(prefix="/api/users")
+router = APIRouter(prefix="/api/users", dependencies=[Depends(request_session_scope)])
 
+USERS_BATCH_MAX_SIZE = int(os.getenv('USERS_BATCH_MAX_SIZE', 1000))
 
-@router.get("/", response_model=Page[UserData], status_code=HTTPStatus.OK)
-async def get_users() -> Page[UserData]:
-    db = Session(engine)
-    return paginate(db, select(UserData).order_by(UserData.id))
+
+def check_batch_size(size: int):
+    if size > USERS_BATCH_MAX_SIZE:
+        raise HTTPException(status_code=HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"Batch size exceeds {USERS_BATCH_MAX_SIZE}")
+
+
+def requested_fields(fields: str | None = None) -> tuple[str, ...] | None:
+    """
+    Набор полей fields=: в SQL выбираются только эти колонки (и колонки ETag/Last-Modified), порядок - как в модели
+    """
+    if not fields:
+        return None
+    names = {name.strip() for name in fields.split(',') if name.strip()}
+    unknown = names.difference(USER_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+                            detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(name for name in USER_FIELDS if name in names)
+
+
+def batch_item_result(user_id: int, user: UserData | None, status: HTTPStatus) -> UserBatchItemResult:
+    if user is None:
+        return UserBatchItemResult(id=user_id, status=HTTPStatus.NOT_FOUND, detail="User not found")
+    return UserBatchItemResult(id=user_id, status=status, data=user)
+
+
+@router.get("/", response_model=UsersPage, status_code=HTTPStatus.OK,
+            responses={HTTPStatus.OK: {"model": Union[UsersPage, CursorPage]}})
+async def get_users(pagination: Literal['offset', 'cursor'] = 'offset',
+                    cursor: str | None = None,
+                    count: CountStrategy = USERS_COUNT_STRATEGY,
+                    filters: UserFilter = Depends(),
+                    fields: tuple[str, ...] | None = Depends(requested_fields),
+                    if_none_match: str | None = Header(None)) -> Response:
+    """
+    По умолчанию страница с page/size и total, total считается стратегией count (exact, cached, estimate).
+    В режиме pagination=cursor (или при переданном cursor) выборка идёт по id без OFFSET и COUNT,
+    а в ответе вместо total курсоры next/previous.
+    Фильтры: email - точное совпадение, first_name и last_name - префикс без учёта регистра, job - точное.
+    С fields=id,email пользователи в items содержат только эти поля. size - до USERS_PAGE_MAX_SIZE,
+    страница больше USERS_PAGE_STREAM_THRESHOLD пользователей отдаётся потоком.
+    Страница отдаётся с ETag, при совпадении If-None-Match - 304 без тела
+    """
+    if pagination == 'cursor' or cursor is not None:
+        try:
+            position = Cursor.decode(cursor) if cursor else None
+        except ValueError:
+            raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail="Invalid cursor")
+        page = await users.get_users_keyset(resolve_params().size, position, filters, fields)
+        headers = validator_headers(page_etag(page.items, page.size, page.next, page.previous, fields), None)
+        if is_not_modified(headers['ETag'], None, if_none_match, None):
+            return not_modified_response(headers)
+        return cursor_page_response(page, headers, fields)
+    params = resolve_params()
+    raw_params = params.to_raw_params()
+    items = await users.get_users_page(raw_params.offset, raw_params.limit, filters, fields)
+    total = await users.count_users(count, filters)
+    headers = validator_headers(page_etag(items, total, params.page, params.size, fields), None)
+    if is_not_modified(headers['ETag'], None, if_none_match, None):
+        return not_modified_response(headers)
+    return page_response(items, total, params.page, params.size, headers, fields)
+
+
+@router.post("/batch", response_model=UserBatchResponse, status_code=HTTPStatus.CREATED)
+async def create_users_batch(new_users: list[UserCreateData]) -> UserBatchResponse:
+    check_batch_size(len(new_users))
+    created = await users.create_users(new_users)
+    return UserBatchResponse(items=[UserBatchItemResult(id=user.id, status=HTTPStatus.CREATED, data=user)
+                                    for user in created])
+
+
+@router.get("/batch", response_model=UserBatchResponse)
+async def get_users_batch(ids: list[int] = Query()) -> UserBatchResponse:
+    check_batch_size(len(ids))
+    found = await users.get_users_by_ids(ids)
+    return UserBatchResponse(items=[batch_item_result(user_id, found.get(user_id), HTTPStatus.OK) for user_id in ids])
+
+
+@router.patch("/batch", response_model=UserBatchResponse)
+async def update_users_batch(items: list[UserBatchUpdateData]) -> UserBatchResponse:
+    check_batch_size(len(items))
+    updated = await users.update_users(items)
+    return UserBatchResponse(items=[batch_item_result(item.id, updated.get(item.id), HTTPStatus.OK)
+                                    for item in items])
+
+
+@router.delete("/batch", response_model=UserBatchResponse)
+async def delete_users_batch(ids: list[int] = Query()) -> UserBatchResponse:
+    check_batch_size(len(ids))
+    deleted = await users.delete_users(ids)
+    return UserBatchResponse(items=[
+        UserBatchItemResult(id=user_id, status=HTTPStatus.NO_CONTENT) if user_id in deleted
+        else batch_item_result(user_id, None, HTTPStatus.NO_CONTENT)
+        for user_id in ids])
+
+
+EXPORT_MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+async def ndjson_chunks(chunks: AsyncIterator[Sequence[dict[str, Any]]]) -> AsyncIterator[str]:
+    # закрытие выгрузки закрывает и чтение из БД, а не оставляет его сборщику мусора
+    async with aclosing(chunks):
+        async for rows in chunks:
+            yield ''.join(orjson.dumps(dict(row), option=ORJSON_OPTIONS).decode() + '\n' for row in rows)
+
+
+async def csv_chunks(chunks: AsyncIterator[Sequence[dict[str, Any]]]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=USER_FIELDS)
+    writer.writeheader()
+    async with aclosing(chunks):
+        async for rows in chunks:
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+@router.get("/export")
+async def export_users(format: Literal['ndjson', 'csv'] = 'ndjson', id_from: int | None = None,
+                       id_to: int | None = None) -> StreamingResponse:
+    """
+    Выгрузка пользователей потоком NDJSON или CSV, с фильтром по диапазону id.
+    Строки читаются серверным курсором пачками, поэтому память не зависит от размера таблицы
+    """
+    chunks = users.iter_users(id_from, id_to)
+    body = ndjson_chunks(chunks) if format == 'ndjson' else csv_chunks(chunks)
+    return StreamingResponse(body, media_type=EXPORT_MEDIA_TYPES[format],
+                             headers={'Content-Disposition': f'attachment; filename="users.{format}"'})
+
+
+def sse_message(change: UserChange) -> bytes:
+    return (f'id: {change.id}\nevent: {change.type}\ndata: '.encode() +
+            orjson.dumps(change.model_dump(), option=ORJSON_OPTIONS) + b'\n\n')
+
+
+async def change_events(subscription: Subscription) -> AsyncIterator[bytes]:
+    try:
+        if subscription.reset_id is not None:
+            yield f'id: {subscription.reset_id}\nevent: reset\ndata: {{}}\n\n'.encode()
+        async for change in subscription.events(USERS_CHANGES_HEARTBEAT):
+            yield b': keep-alive\n\n' if change is None else sse_message(change)
+    finally:
+        user_changes.unsubscribe(subscription)
+
+
+@router.get("/changes")
+async def get_user_changes(after: int | None = None, last_event_id: str | None = Header(None)) -> StreamingResponse:
+    """
+    Изменения пользователей (created, updated, deleted) потоком Server-Sent Events.
+    Переподключение с Last-Event-ID (или after) продолжает с пропущенных изменений; если они уже вытеснены
+    из истории, приходит событие reset и клиент пересинхронизируется через GET /api/users/
+    """
+    if after is None and last_event_id:
+        try:
+            after = int(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail="Invalid Last-Event-ID")
+    return StreamingResponse(change_events(user_changes.subscribe(after)), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
 @router.get("/{user_id}", response_model=UserResponse)
-async def get_user(user_id: int) -> Union[UserResponse, JSONResponse]:
+async def get_user(user_id: int, fields: tuple[str, ...] | None = Depends(requested_fields),
+                   include_support: bool = True, if_none_match: str | None = Header(None),
+                   if_modified_since: str | None = Header(None)) -> Response:
+    """
+    С fields=id,email в data только эти поля, с include_support=false ответ без блока support
+    """
     if user_id < 1:
         raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail="Invalid user id")
-    user = users.get_user(user_id)
+    user = await users.get_user(user_id, fields)
     if not user:
         return JSONResponse(status_code=HTTPStatus.NOT_FOUND, content={})
-    return UserResponse(data=user, support=support_data)
+    modified = last_modified([user])
+    headers = validator_headers(user_etag(user, representation_variant(fields, include_support)), modified)
+    if is_not_modified(headers['ETag'], modified, if_none_match, if_modified_since):
+        return not_modified_response(headers)
+    return user_response(user, headers, fields, include_support)
 
 
 @router.post("/", response_model=UserCreateResponse, status_code=HTTPStatus.CREATED)
-async def create_user(user: UserCreateData) -> UserCreateResponse:
-    UserCreateData.model_validate(user.model_dump())
-    formatted_date = datetime.now().strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
-    user_db = users.create_user_from_api_request(user)
-    return UserCreateResponse(name=user.name, job=user_db.job, id=str(user_db.id), createdAt=formatted_date)
+async def create_user(user: UserCreateData) -> Response:
+    """
+    С USERS_WRITE_BATCHING=true создание ждёт общей записи пачки, ответ тот же
+    """
+    if user_creates.enabled:
+        user_db = await user_creates.submit(user)
+    else:
+        user_db = await users.create_user_from_api_request(user)
+    return created_response(user.name, user_db.job, user_db.id, format_timestamp(user_db.updated_at),
+                            validator_headers(user_etag(user_db), last_modified([user_db])))
 
 
 @router.patch("/{user_id}", response_model=UserUpdatedResponse)
-async def update_user(user_id: int, user: UserCreateData) -> Union[UserUpdatedResponse, JSONResponse]:
-    UserCreateData.model_validate(user.model_dump())
-    formatted_date = datetime.now().strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
-    user_db = users.update_user(user_id, user)
-    return UserUpdatedResponse(name=user_db.first_name, job=user_db.job, updatedAt=formatted_date)
+async def update_user(user_id: int, user: UserCreateData, if_match: str | None = Header(None)) -> Response:
+    """
+    С If-Match обновление выполняется, только если ETag пользователя не изменился, иначе 412
+    """
+    user_db = await users.update_user(user_id, user, if_match_versions(user_id, if_match))
+    return updated_response(user_db.first_name, user_db.job, format_timestamp(user_db.updated_at),
+                            validator_headers(user_etag(user_db), last_modified([user_db])))
 
 
-@router.delete("/{user_id}")
-async def delete_user(user_id: int) -> JSONResponse:
+@router.delete("/{user_id}", status_code=HTTPStatus.NO_CONTENT)
+async def delete_user(user_id: int, if_match: str | None = Header(None)) -> Response:
+    """
+    С If-Match удаление выполняется, только если ETag пользователя не изменился, иначе 412
+    """
     if user_id < 1:
         raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail="Invalid user id")
-    users.delete_user(user_id)
-    return JSONResponse(status_code=HTTPStatus.NO_CONTENT, content=None)
+    await users.delete_user(user_id, if_match_versions(user_id, if_match))
+    return Response(status_code=HTTPStatus.NO_CONTENT)
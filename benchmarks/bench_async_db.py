@@ -0,0 +1,84 @@
+"""
+Сравнение задержки p99 при конкурентных чтениях и записях: синхронные хелперы БД,
+вызванные внутри корутины (как делали async-хэндлеры раньше), против AsyncSession.
+
+Запросы подаются с постоянной частотой (open-loop), задержка считается от запланированного
+момента отправки, поэтому блокировка event loop-а видна в хвосте распределения.
+
+    DATABASE_ENGINE=sqlite:///bench.db DATABASE_POOL_SIZE=10 python -m benchmarks.bench_async_db --rate 300
+"""
+import argparse
+import asyncio
+import random
+
+from app.database import async_users, users
+from app.database.engine import async_engine, create_db_and_tables
+from app.models.user import UserCreateData
+from benchmarks.common import format_summary, summarize
+
+NEW_USER = UserCreateData(name='bench user', job='bench')
+
+
+async def sync_read():
+    users.get_user(random.randint(1, 12))
+
+
+async def sync_write():
+    user = users.create_user_from_api_request(NEW_USER)
+    users.delete_user(user.id)
+
+
+async def async_read():
+    await async_users.get_user(random.randint(1, 12))
+
+
+async def async_write():
+    user = await async_users.create_user_from_api_request(NEW_USER)
+    await async_users.delete_user(user.id)
+
+
+MODES = {
+    'sync': (sync_read, sync_write),
+    'async': (async_read, async_write),
+}
+
+
+async def run(mode: str, rate: float, duration: float, write_ratio: float) -> dict:
+    read, write = MODES[mode]
+    loop = asyncio.get_running_loop()
+    latencies = []
+
+    async def timed(operation, due: float):
+        await operation()
+        latencies.append(loop.time() - due)
+
+    tasks = []
+    start = loop.time()
+    for i in range(int(rate * duration)):
+        due = start + i / rate
+        delay = due - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        operation = write if random.random() < write_ratio else read
+        tasks.append(asyncio.create_task(timed(operation, due)))
+    await asyncio.gather(*tasks)
+    await async_engine.dispose()
+    return summarize(latencies, loop.time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rate', type=float, default=200, help='запросов в секунду')
+    parser.add_argument('--duration', type=float, default=10, help='длительность прогона, с')
+    parser.add_argument('--write-ratio', type=float, default=0.2, help='доля операций записи')
+    parser.add_argument('--mode', choices=[*MODES, 'both'], default='both')
+    args = parser.parse_args()
+
+    create_db_and_tables()
+    for mode in MODES if args.mode == 'both' else [args.mode]:
+        summary = asyncio.run(run(mode, args.rate, args.duration, args.write_ratio))
+        print(format_summary(mode, summary))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Загрузка и удаление пользователей: по одному (create_user_from_api_request / delete_user)
+против пакетов (create_users / delete_users) одной транзакцией.
+
+    DATABASE_ENGINE=sqlite:///bench.db DATABASE_POOL_SIZE=10 python -m benchmarks.bench_batch --users 10000
+"""
+import argparse
+import asyncio
+import time
+
+from app.database import async_users
+from app.database.engine import async_engine, create_db_and_tables
+from app.models.user import UserCreateData
+
+NEW_USER = UserCreateData(name='bench user', job='bench')
+
+
+async def single(count: int) -> tuple[float, float]:
+    start = time.perf_counter()
+    created = [await async_users.create_user_from_api_request(NEW_USER) for _ in range(count)]
+    loaded = time.perf_counter()
+    for user in created:
+        await async_users.delete_user(user.id)
+    return loaded - start, time.perf_counter() - loaded
+
+
+async def batched(count: int, batch_size: int) -> tuple[float, float]:
+    start = time.perf_counter()
+    created = []
+    for offset in range(0, count, batch_size):
+        created.extend(await async_users.create_users([NEW_USER] * min(batch_size, count - offset)))
+    loaded = time.perf_counter()
+    ids = [user.id for user in created]
+    for offset in range(0, count, batch_size):
+        await async_users.delete_users(ids[offset:offset + batch_size])
+    return loaded - start, time.perf_counter() - loaded
+
+
+async def run(count: int, batch_size: int):
+    for name, load, cleanup in [('single', *await single(count)), ('batch', *await batched(count, batch_size))]:
+        print(f"{name:<8} create={count / load:>10.1f} users/s  delete={count / cleanup:>10.1f} users/s")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    create_db_and_tables()
+    asyncio.run(run(args.users, args.batch_size))
+
+
+if __name__ == '__main__':
+    main()
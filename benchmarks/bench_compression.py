@@ -0,0 +1,114 @@
+"""
+Сжатие страниц GET /api/users/ через AsyncFastApiApp: для каждого size и каждой кодировки - байты на проводе
+против несжатого тела, время CPU процесса на запрос и отдельно время сжатия тела на сервере.
+На --target asgi (по умолчанию) приложение и клиент в одном процессе, поэтому CPU на запрос включает
+и распаковку клиентом; compress_ms - только сжатие. Недостающие пользователи досоздаются пачками.
+Уровни задаются как у сервиса: COMPRESSION_GZIP_LEVEL, COMPRESSION_ZSTD_LEVEL, COMPRESSION_BROTLI_LEVEL.
+
+    python -m benchmarks.bench_compression --sizes 10,100,1000,10000 --requests 20 --output compression.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from contextlib import AsyncExitStack
+
+from benchmarks.common import percentile
+from utils.fast_api_app import AsyncFastApiApp
+
+NEW_USER = {'name': 'bench user', 'job': 'bench'}
+BATCH_SIZE = 1000
+
+
+async def ensure_users(client: AsyncFastApiApp, count: int):
+    total = (await client.get_all_users(params={'size': 1})).json()['total']
+    while total < count:
+        batch = min(BATCH_SIZE, count - total)
+        response = await client.create_users([NEW_USER] * batch)
+        response.raise_for_status()
+        total += batch
+
+
+def compress_ms(compressor_factory, body: bytes, repeat: int) -> float:
+    start = time.process_time()
+    for _ in range(repeat):
+        compressor = compressor_factory()
+        compressor.compress(body)
+        compressor.finish()
+    return (time.process_time() - start) / repeat * 1000
+
+
+async def measure(client: AsyncFastApiApp, size: int, encoding: str, requests: int, compressors: dict) -> dict:
+    params, headers = {'page': 1, 'size': size}, {'Accept-Encoding': encoding}
+    latencies, cpu, wire = [], [], []
+    body = b''
+    for _ in range(requests):
+        start, start_cpu = time.perf_counter(), time.process_time()
+        response = await client.get_all_users(params=params, headers=headers)
+        cpu.append(time.process_time() - start_cpu)
+        latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+        wire.append(response.num_bytes_downloaded)
+        body = response.content
+    served = response.headers.get('content-encoding', 'identity')
+    return {
+        'size': size, 'encoding': encoding, 'served': served, 'identity_bytes': len(body),
+        'wire_bytes': round(statistics.mean(wire)), 'ratio': round(len(body) / statistics.mean(wire), 2),
+        'cpu_ms': round(statistics.mean(cpu) * 1000, 3), 'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'compress_ms': round(compress_ms(compressors[served], body, requests), 3) if served in compressors else 0.0,
+    }
+
+
+async def run(target: str, sizes: list[int], encodings: list[str], requests: int) -> list[dict]:
+    async with AsyncExitStack() as stack:
+        if target == 'asgi':
+            os.environ.setdefault('DATABASE_ENGINE', 'sqlite:///./benchmark.db')
+            os.environ.setdefault('USERS_PAGE_MAX_SIZE', str(max(sizes)))
+            os.environ.setdefault('USERS_BATCH_MAX_SIZE', str(BATCH_SIZE))
+            from app.main import app
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            client = AsyncFastApiApp.from_asgi(app, max_connections=1)
+        else:
+            # на стенде size ограничен его USERS_PAGE_MAX_SIZE
+            client = AsyncFastApiApp.from_env(target, max_connections=1)
+        await stack.enter_async_context(client)
+        from app.routers.compression import available_compressors
+
+        compressors = available_compressors('gzip,br,zstd')
+        await ensure_users(client, max(sizes))
+        results = []
+        for size in sizes:
+            for encoding in encodings:
+                if encoding != 'identity' and encoding not in compressors:
+                    print(f'skip {encoding}: library is not installed')
+                    continue
+                # первый запрос прогревает кэш и соединения и в замер не входит
+                await client.get_all_users(params={'page': 1, 'size': size}, headers={'Accept-Encoding': encoding})
+                results.append(await measure(client, size, encoding, requests, compressors))
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', default='asgi', help='asgi или окружение config.Server: rc, dev, beta')
+    parser.add_argument('--sizes', default='10,100,1000,10000')
+    parser.add_argument('--encodings', default='identity,gzip,br,zstd')
+    parser.add_argument('--requests', type=int, default=20, help='запросов на каждую пару size/кодировка')
+    parser.add_argument('--output', help='сохранить результат в JSON')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = asyncio.run(run(args.target, sizes, args.encodings.split(','), args.requests))
+    for result in results:
+        print(f"size={result['size']:<6} {result['encoding']:<9} served={result['served']:<9} "
+              f"bytes={result['identity_bytes']:>9} -> {result['wire_bytes']:>9} x{result['ratio']:<6} "
+              f"cpu={result['cpu_ms']}ms compress={result['compress_ms']}ms p50={result['p50_ms']}ms")
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'target': args.target, 'results': results}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Накладные расходы сбора метрик: ASGI-запрос через MetricsMiddleware против голого приложения
+и SQL-выражение на инструментированном движке против обычного. Результат в микросекундах на операцию.
+
+    python -m benchmarks.bench_metrics_overhead --requests 50000 --statements 20000
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import create_engine, text
+
+from app.monitoring.metrics import MetricsMiddleware, instrument_engine
+
+
+class Route:
+    path = '/api/users/{user_id}'
+
+
+async def plain_app(scope, receive, send):
+    scope['route'] = Route
+    await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+    await send({'type': 'http.response.body', 'body': b'{}'})
+
+
+async def receive():
+    return {'type': 'http.request', 'body': b''}
+
+
+async def send(message):
+    pass
+
+
+async def time_requests(app, count: int) -> float:
+    scope = {'type': 'http', 'method': 'GET', 'path': '/api/users/1'}
+    start = time.perf_counter()
+    for _ in range(count):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / count
+
+
+def time_statements(instrumented: bool, count: int) -> float:
+    engine = create_engine('sqlite://')
+    if instrumented:
+        instrument_engine(engine, 'bench')
+    with engine.connect() as connection:
+        start = time.perf_counter()
+        for _ in range(count):
+            connection.execute(text('SELECT 1'))
+        return (time.perf_counter() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=50000)
+    parser.add_argument('--statements', type=int, default=20000)
+    args = parser.parse_args()
+
+    plain = asyncio.run(time_requests(plain_app, args.requests))
+    measured = asyncio.run(time_requests(MetricsMiddleware(plain_app), args.requests))
+    print(f"request   plain={plain * 1e6:.2f}us  with metrics={measured * 1e6:.2f}us  "
+          f"overhead={(measured - plain) * 1e6:.2f}us")
+
+    plain = time_statements(False, args.statements)
+    measured = time_statements(True, args.statements)
+    print(f"statement plain={plain * 1e6:.2f}us  with metrics={measured * 1e6:.2f}us  "
+          f"overhead={(measured - plain) * 1e6:.2f}us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Занятые соединения пула на длинном прогоне через ASGI: смесь чтений, страниц с количеством и записей.
+После каждых --sample-every запросов снимается число выданных соединений; в конце прогона оно должно
+вернуться к нулю, а максимум не превышать конкурентность. Иначе код возврата 1.
+
+    DATABASE_ENGINE=sqlite:///bench.db DATABASE_POOL_SIZE=10 python -m benchmarks.bench_pool_usage --requests 100000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+
+from utils.fast_api_app import AsyncFastApiApp
+
+NEW_USER = {'name': 'bench user', 'job': 'bench'}
+
+
+async def run(requests: int, concurrency: int, sample_every: int) -> tuple[list[int], int, int]:
+    os.environ.setdefault('DATABASE_ENGINE', 'sqlite:///./benchmark.db')
+    os.environ.setdefault('DATABASE_POOL_SIZE', str(concurrency))
+    from app.database.engine import async_engine
+    from app.main import app
+    from app.monitoring.leaks import connection_leaks
+
+    samples = []
+    remaining = requests
+
+    async def worker(client: AsyncFastApiApp):
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            if remaining % sample_every == 0:
+                samples.append(connection_leaks.checked_out)
+            choice = random.random()
+            if choice < 0.5:
+                await client.get_user_by_id(random.randint(1, 12))
+            elif choice < 0.9:
+                await client.get_all_users(params={'page': random.randint(1, 3), 'size': 10})
+            else:
+                response = await client.create_user(NEW_USER)
+                if response.status_code == 201:
+                    await client.delete_user(int(response.json()['id']))
+
+    async with app.router.lifespan_context(app):
+        async with AsyncFastApiApp.from_asgi(app, max_connections=concurrency) as client:
+            await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        connection_leaks.check()
+        final = connection_leaks.checked_out
+        leaks = connection_leaks.leaks
+    await async_engine.dispose()
+    return samples, final, leaks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=100000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--sample-every', type=int, default=1000)
+    args = parser.parse_args()
+
+    samples, final, leaks = asyncio.run(run(args.requests, args.concurrency, args.sample_every))
+    print(f"samples={len(samples)} max_checked_out={max(samples, default=0)} final_checked_out={final} "
+          f"leaks={leaks}")
+    if final or leaks or max(samples, default=0) > args.concurrency:
+        print('REGRESSION connections are not returned to the pool')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Сериализация ответов: путь FastAPI по умолчанию (модель ответа, повторная валидация по response_model,
+json.dumps) против быстрого пути app.routers.responses. Однопоточный замер, т.е. ответов в секунду на ядро.
+Перед замером проверяется побайтовое совпадение ответов.
+
+    python -m benchmarks.bench_serialization --iterations 20000
+"""
+import argparse
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi_pagination import Page
+from pydantic import TypeAdapter
+
+from app.database.data import users_data
+from app.models.support import support_data
+from app.models.user import PublicUserData, UserData, UserResponse
+from app.routers.responses import page_response, user_response
+
+PUBLIC_FIELDS = set(PublicUserData.model_fields)
+USERS = [UserData(id=user_id, **user.model_dump(exclude={'id'})) for user_id, user in users_data.items()]
+
+
+def default_user_body(adapter: TypeAdapter, user: UserData) -> bytes:
+    content = UserResponse(data=user, support=support_data).model_dump()
+    return JSONResponse(adapter.dump_python(adapter.validate_python(content), mode='json')).body
+
+
+def default_page_body(adapter: TypeAdapter, items: list[UserData]) -> bytes:
+    content = {'items': [user.model_dump(include=PUBLIC_FIELDS) for user in items], 'total': 1000, 'page': 1,
+               'size': len(items), 'pages': -(-1000 // len(items))}
+    return JSONResponse(adapter.dump_python(adapter.validate_python(content), mode='json')).body
+
+
+def per_second(func, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--page-size', type=int, default=50)
+    args = parser.parse_args()
+
+    user = USERS[0]
+    items = (USERS * (args.page_size // len(USERS) + 1))[:args.page_size]
+    user_adapter, page_adapter = TypeAdapter(UserResponse), TypeAdapter(Page[PublicUserData])
+    assert default_user_body(user_adapter, user) == user_response(user).body
+    assert default_page_body(page_adapter, items) == page_response(items, 1000, 1, len(items)).body
+
+    cases = {
+        'user': (lambda: default_user_body(user_adapter, user), lambda: user_response(user).body),
+        f'page size={args.page_size}': (lambda: default_page_body(page_adapter, items),
+                                        lambda: page_response(items, 1000, 1, len(items)).body),
+    }
+    for name, (default, fast) in cases.items():
+        default_rate, fast_rate = per_second(default, args.iterations), per_second(fast, args.iterations)
+        print(f"{name:<16} default={default_rate:>10.0f}/s  fast={fast_rate:>10.0f}/s  x{fast_rate / default_rate:.1f}")
+
+
+if __name__ == '__main__':
+    main()
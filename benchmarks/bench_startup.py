@@ -0,0 +1,99 @@
+"""
+Время старта сервиса: холодный импорт app.main и время до первого ответа (импорт, lifespan, GET /status)
+в отдельном процессе на каждый замер. Первый старт идёт на пустой БД SQLite (DDL и начальные пользователи),
+повторные - на уже заполненной, как перезапуск пода.
+
+    python -m benchmarks.bench_startup --runs 5 --output startup.json
+    python -m benchmarks.bench_startup --compare startup.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+CHILD_MODES = ('import', 'first-request')
+
+
+async def first_request() -> float:
+    import httpx
+
+    from app.main import app
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://testserver') as client:
+            response = await client.get('/status')
+            response.raise_for_status()
+    return time.perf_counter()
+
+
+def child(mode: str):
+    start = time.perf_counter()
+    if mode == 'import':
+        import app.main  # noqa: F401
+        end = time.perf_counter()
+    else:
+        end = asyncio.run(first_request())
+    print(end - start)
+
+
+def measure(mode: str, database_url: str) -> float:
+    env = {**os.environ, 'DATABASE_ENGINE': database_url}
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_startup', '--child', mode], env=env,
+                            check=True, capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def summarize_runs(values: list[float]) -> dict:
+    return {'runs': len(values), 'median_ms': round(statistics.median(values) * 1000, 1),
+            'min_ms': round(min(values) * 1000, 1), 'max_ms': round(max(values) * 1000, 1)}
+
+
+def run(runs: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f'sqlite:///{directory}/startup.db'
+        results = {'first_boot': summarize_runs([measure('first-request', database_url)])}
+        results['cold_import'] = summarize_runs([measure('import', database_url) for _ in range(runs)])
+        results['time_to_first_request'] = summarize_runs([measure('first-request', database_url)
+                                                           for _ in range(runs)])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--output', help='сохранить результат в JSON как базовый')
+    parser.add_argument('--compare', help='сравнить с базовым JSON, код возврата 1 при регрессии')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--child', choices=CHILD_MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    results = run(args.runs)
+    for name, summary in results.items():
+        print(f"{name:<24} median={summary['median_ms']}ms min={summary['min_ms']}ms max={summary['max_ms']}ms")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'results': results}, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)['results']
+        regressions = [f"{name}: {results[name]['median_ms']}ms > {base['median_ms']}ms"
+                       for name, base in baseline.items()
+                       if name in results and results[name]['median_ms'] > base['median_ms'] * (1 + args.tolerance)]
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
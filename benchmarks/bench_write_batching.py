@@ -0,0 +1,59 @@
+"""
+Создание пользователей конкурентными запросами: каждый в своей транзакции (create_user_from_api_request)
+против group commit через CreateBatcher (одна транзакция с многострочным INSERT на пачку).
+
+    DATABASE_ENGINE=sqlite:///bench.db DATABASE_POOL_SIZE=10 python -m benchmarks.bench_write_batching \\
+        --users 10000 --concurrency 200
+"""
+import argparse
+import asyncio
+import time
+
+from app.database import async_users
+from app.database.batching import CreateBatcher
+from app.database.engine import async_engine, create_db_and_tables
+from app.models.user import UserCreateData
+
+NEW_USER = UserCreateData(name='bench user', job='bench')
+
+
+async def create_concurrently(create, count: int, concurrency: int) -> tuple[float, list[int]]:
+    ids = []
+    remaining = count
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            ids.append((await create(NEW_USER)).id)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start, ids
+
+
+async def run(count: int, concurrency: int, batch_size: int, delay_ms: float):
+    batcher = CreateBatcher(async_users.create_users, batch_size, delay_ms / 1000, enabled=True)
+    for name, create in [('single', async_users.create_user_from_api_request), ('batched', batcher.submit)]:
+        elapsed, ids = await create_concurrently(create, count, concurrency)
+        print(f"{name:<8} create={count / elapsed:>10.1f} users/s")
+        for offset in range(0, len(ids), 1000):
+            await async_users.delete_users(ids[offset:offset + 1000])
+    await batcher.drain()
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--concurrency', type=int, default=200, help='одновременных запросов на создание')
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--delay-ms', type=float, default=5, help='максимальное ожидание пачки, мс')
+    args = parser.parse_args()
+
+    create_db_and_tables()
+    asyncio.run(run(args.users, args.concurrency, args.batch_size, args.delay_ms))
+
+
+if __name__ == '__main__':
+    main()
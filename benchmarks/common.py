@@ -0,0 +1,33 @@
+import math
+from typing import Sequence
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """
+    Перцентиль методом ближайшего ранга, q в диапазоне 0..100
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies: Sequence[float], elapsed: float) -> dict:
+    """
+    Сводка по замерам: количество, пропускная способность и перцентили задержки в мс
+    """
+    return {
+        'count': len(latencies),
+        'rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'max_ms': round(max(latencies, default=0.0) * 1000, 3),
+    }
+
+
+def format_summary(name: str, summary: dict) -> str:
+    return (f"{name:<24} n={summary['count']:<7} rps={summary['rps']:<10} "
+            f"p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms "
+            f"max={summary['max_ms']}ms")
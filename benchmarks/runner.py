@@ -0,0 +1,168 @@
+"""
+Нагрузочный прогон сервиса через AsyncFastApiApp.
+
+Цель: приложение в процессе через ASGI-транспорт на SQLite (--target asgi, по умолчанию)
+или живой стенд из config.Server (--target rc|dev|beta). Воркеры (--concurrency) выполняют
+операции в пропорции --mix, результат - пропускная способность и p50/p95/p99 по каждой операции.
+
+    python -m benchmarks.runner --concurrency 50 --duration 10 --mix get=60,list=20,create=10,patch=5,delete=5 \\
+        --output baseline.json
+    python -m benchmarks.runner --compare baseline.json --tolerance 0.15
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from contextlib import AsyncExitStack
+from typing import Awaitable, Callable
+
+from benchmarks.common import format_summary, summarize
+from utils.fast_api_app import AsyncFastApiApp
+
+DEFAULT_MIX = 'get=60,list=20,create=10,patch=5,delete=5'
+NEW_USER = {'name': 'bench user', 'job': 'bench'}
+
+
+def parse_mix(mix: str) -> dict[str, int]:
+    weights = {}
+    for part in mix.split(','):
+        name, weight = part.split('=')
+        if name not in OPERATIONS:
+            raise ValueError(f'Неизвестная операция {name}, доступны: {", ".join(OPERATIONS)}')
+        weights[name] = int(weight)
+    return weights
+
+
+class Workload:
+    """
+    Операции нагрузки. patch и delete работают с пользователями, созданными этим же прогоном
+    """
+
+    def __init__(self, client: AsyncFastApiApp, page_size: int):
+        self.client = client
+        self.page_size = page_size
+        self.created: list[int] = []
+
+    async def get(self):
+        return await self.client.get_user_by_id(random.randint(1, 12))
+
+    async def list(self):
+        return await self.client.get_all_users(params={'page': random.randint(1, 3), 'size': self.page_size})
+
+    async def create(self):
+        response = await self.client.create_user(NEW_USER)
+        if response.status_code == 201:
+            self.created.append(int(response.json()['id']))
+        return response
+
+    async def patch(self):
+        if not self.created:
+            return await self.create()
+        return await self.client.update_user(random.choice(self.created), NEW_USER)
+
+    async def delete(self):
+        if not self.created:
+            return await self.create()
+        return await self.client.delete_user(self.created.pop(random.randrange(len(self.created))))
+
+
+OPERATIONS = ('get', 'list', 'create', 'patch', 'delete')
+
+
+async def run_workload(client: AsyncFastApiApp, mix: dict[str, int], concurrency: int, duration: float,
+                       page_size: int) -> dict:
+    workload = Workload(client, page_size)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies: dict[str, list[float]] = {name: [] for name in names}
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            name = random.choices(names, weights)[0]
+            operation: Callable[[], Awaitable] = getattr(workload, name)
+            start = time.perf_counter()
+            response = await operation()
+            latencies[name].append(time.perf_counter() - start)
+            if response.status_code >= 500:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    results = {name: summarize(values, elapsed) for name, values in latencies.items()}
+    results['total'] = summarize([value for values in latencies.values() for value in values], elapsed)
+    results['total']['errors'] = errors
+    return results
+
+
+async def run(target: str, mix: dict[str, int], concurrency: int, duration: float, page_size: int) -> dict:
+    async with AsyncExitStack() as stack:
+        if target == 'asgi':
+            os.environ.setdefault('DATABASE_ENGINE', 'sqlite:///./benchmark.db')
+            os.environ.setdefault('DATABASE_POOL_SIZE', str(concurrency))
+            from app.main import app
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            client = AsyncFastApiApp.from_asgi(app, max_connections=concurrency)
+        else:
+            client = AsyncFastApiApp.from_env(target, max_connections=concurrency)
+        await stack.enter_async_context(client)
+        return await run_workload(client, mix, concurrency, duration, page_size)
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Регрессии относительно сохранённого прогона: p99 выше или rps ниже базового больше чем на tolerance
+    """
+    regressions = []
+    for name, base in baseline['results'].items():
+        current = results.get(name)
+        if current is None:
+            continue
+        if current['p99_ms'] > base['p99_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {current['p99_ms']}ms > {base['p99_ms']}ms")
+        if current['rps'] < base['rps'] * (1 - tolerance):
+            regressions.append(f"{name}: rps {current['rps']} < {base['rps']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', default='asgi', help='asgi или окружение config.Server: rc, dev, beta')
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=10, help='длительность прогона, с')
+    parser.add_argument('--mix', default=DEFAULT_MIX)
+    parser.add_argument('--page-size', type=int, default=10)
+    parser.add_argument('--output', help='сохранить результат в JSON как базовый')
+    parser.add_argument('--compare', help='сравнить с базовым JSON, код возврата 1 при регрессии')
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    results = asyncio.run(run(args.target, mix, args.concurrency, args.duration, args.page_size))
+    for name, summary in results.items():
+        print(format_summary(name, summary))
+
+    if args.output:
+        config = {'target': args.target, 'concurrency': args.concurrency, 'duration': args.duration,
+                  'mix': mix, 'page_size': args.page_size}
+        with open(args.output, 'w') as file:
+            json.dump({'config': config, 'results': results}, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
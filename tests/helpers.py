@@ -0,0 +1,36 @@
+import asyncio
+from contextlib import contextmanager
+
+from sqlalchemy import Engine, event
+
+from app.database.engine import async_engine
+
+
+@contextmanager
+def count_queries(db_engine: Engine):
+    """Подсчёт SQL-выражений и выдач соединений из пула внутри блока"""
+    counter = {'statements': 0, 'checkouts': 0}
+
+    def on_execute(*args):
+        counter['statements'] += 1
+
+    def on_checkout(*args):
+        counter['checkouts'] += 1
+
+    event.listen(db_engine, 'before_cursor_execute', on_execute)
+    event.listen(db_engine.pool, 'checkout', on_checkout)
+    try:
+        yield counter
+    finally:
+        event.remove(db_engine, 'before_cursor_execute', on_execute)
+        event.remove(db_engine.pool, 'checkout', on_checkout)
+
+
+def run_async(coroutine):
+    async def run():
+        try:
+            return await coroutine
+        finally:
+            await async_engine.dispose()
+
+    return asyncio.run(run())
@@ -0,0 +1,114 @@
+import asyncio
+
+from app.monitoring.admission import AdmissionLimiter, AdmissionMiddleware, route_group
+
+
+def test_queued_request_gets_released_slot():
+    """Запрос из очереди получает слот завершившегося, порядок FIFO"""
+    limiter = AdmissionLimiter(limit=1, queue_size=2, timeout=1)
+    order = []
+
+    async def request(name: str):
+        assert await limiter.acquire()
+        order.append(name)
+        await asyncio.sleep(0.01)
+        limiter.release()
+
+    async def run():
+        await asyncio.gather(*(request(name) for name in ('first', 'second', 'third')))
+
+    asyncio.run(run())
+    assert order == ['first', 'second', 'third']
+    assert limiter.stats().in_flight == 0
+    assert limiter.stats().admitted == 3
+
+
+def test_full_queue_rejects_immediately():
+    limiter = AdmissionLimiter(limit=1, queue_size=1, timeout=1)
+
+    async def run():
+        assert await limiter.acquire()
+        queued = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        rejected = await limiter.acquire()
+        limiter.release()
+        return rejected, await queued
+
+    assert asyncio.run(run()) == (False, True)
+    assert limiter.rejected == 1
+
+
+def test_queue_deadline():
+    """Запрос не ждёт в очереди дольше timeout и не занимает слот после отказа"""
+    limiter = AdmissionLimiter(limit=1, queue_size=10, timeout=0.01)
+
+    async def run():
+        assert await limiter.acquire()
+        timed_out = await limiter.acquire()
+        limiter.release()
+        return timed_out
+
+    assert asyncio.run(run()) is False
+    stats = limiter.stats()
+    assert (stats.timed_out, stats.waiting, stats.in_flight) == (1, 0, 0)
+
+
+def test_slot_handed_over_at_deadline_released(monkeypatch):
+    """Слот, переданный в том же такте, что и истечение ожидания, возвращается, группа не блокируется"""
+    limiter = AdmissionLimiter(limit=1, queue_size=1, timeout=1)
+
+    async def wait_for_racing_release(future, timeout):
+        limiter.release()
+        raise asyncio.TimeoutError
+
+    async def run():
+        assert await limiter.acquire()
+        with monkeypatch.context() as patch:
+            patch.setattr(asyncio, 'wait_for', wait_for_racing_release)
+            assert await limiter.acquire() is False
+        return await limiter.acquire()
+
+    assert asyncio.run(run()) is True
+    stats = limiter.stats()
+    assert (stats.in_flight, stats.waiting, stats.timed_out) == (1, 0, 1)
+
+
+def test_route_groups():
+    assert route_group('GET', '/api/users/1') == 'reads'
+    assert route_group('POST', '/api/users/') == 'writes'
+    assert route_group('GET', '/health/ready') == 'status'
+    assert route_group('GET', '/api/users/changes') is None
+    assert route_group('GET', '/docs') is None
+
+
+def test_over_capacity_returns_503_with_retry_after():
+    release = asyncio.Event()
+
+    async def app(scope, receive, send):
+        await release.wait()
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    middleware = AdmissionMiddleware(app, {'reads': AdmissionLimiter(limit=1, queue_size=0, timeout=1)},
+                                     retry_after=3)
+
+    async def call() -> dict:
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        await middleware({'type': 'http', 'method': 'GET', 'path': '/api/users/1', 'headers': []}, None, send)
+        return messages[0]
+
+    async def run():
+        served = asyncio.ensure_future(call())
+        await asyncio.sleep(0)
+        shed = await call()
+        release.set()
+        return shed, await served
+
+    shed, served = asyncio.run(run())
+    assert shed['status'] == 503
+    assert (b'retry-after', b'3') in shed['headers']
+    assert served['status'] == 200
@@ -29,3 +29,48 @@ def test_smoke_user(app: FastApiApp):
     user_id = randint(1, 12)
     response = app.get_user_by_id(user_id)
     assert response.status_code == HTTPStatus.OK
+
+
+def test_user_cache_hit(app: FastApiApp):
+    user_id = randint(1, 12)
+    app.get_user_by_id(user_id)
+    hits_before = app.get_cache_status().json()['hits']
+
+    response = app.get_user_by_id(user_id)
+    assert response.status_code == HTTPStatus.OK
+    assert app.get_cache_status().json()['hits'] == hits_before + 1
+
+
+def test_metrics(app: FastApiApp):
+    app.get_user_by_id(1)
+    response = app.get_metrics()
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/plain')
+
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/api/users/{user_id}",status="200"}' in body
+    assert 'db_statement_duration_seconds_bucket' in body
+    assert 'event_loop_lag_seconds' in body
+
+
+def test_liveness(app: FastApiApp):
+    response = app.get_liveness()
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['status'] == 'alive'
+
+
+def test_readiness(app: FastApiApp):
+    response = app.get_readiness()
+    assert response.status_code == HTTPStatus.OK
+
+    body = response.json()
+    assert body['ready']
+    assert body['database']
+    assert not body['stale']
+    assert body['checked_at']
+
+
+def test_status_served_from_probe(app: FastApiApp):
+    checked_at = app.get_status().json()['checked_at']
+    assert checked_at
+    assert app.get_status().json()['checked_at'] == checked_at
@@ -0,0 +1,81 @@
+from http import HTTPStatus
+
+import pytest
+
+from app.database.users import get_max_user_id, get_user
+from app.models.user import UserBatchResponse
+from utils.fast_api_app import FastApiApp
+
+
+@pytest.fixture(scope='function')
+def app(env: str):
+    return FastApiApp(env)
+
+
+@pytest.fixture(scope='function')
+def created_ids(app: FastApiApp) -> list[int]:
+    """Фикстура для создания пачки временных пользователей"""
+    response = app.create_users([{"name": f"batch user {i}", "job": "QA"} for i in range(3)])
+    assert response.status_code == HTTPStatus.CREATED, 'Не удалось создать пользователей'
+    return [item['id'] for item in response.json()['items']]
+
+
+def test_create_users_batch(app: FastApiApp):
+    """Пакетное создание возвращает результат по каждому пользователю в порядке запроса"""
+    new_users = [{"name": "Max", "job": "qa-manual"}, {"name": "Alisa", "job": "qa-auto"}]
+    response = app.create_users(new_users)
+    assert response.status_code == HTTPStatus.CREATED
+    body = UserBatchResponse.model_validate(response.json())
+
+    assert [item.status for item in body.items] == [HTTPStatus.CREATED] * 2
+    assert [item.data.first_name for item in body.items] == ['Max', 'Alisa']
+    for item, new_user in zip(body.items, new_users):
+        db_user = get_user(item.id)
+        assert db_user.first_name == new_user['name']
+        assert db_user.job == new_user['job']
+
+
+def test_get_users_batch(app: FastApiApp):
+    """Пакетное чтение возвращает найденных пользователей и 404 для отсутствующих"""
+    missing_id = get_max_user_id() + 1
+    response = app.get_users_by_ids([1, 2, missing_id])
+    assert response.status_code == HTTPStatus.OK
+    items = response.json()['items']
+
+    assert [item['id'] for item in items] == [1, 2, missing_id]
+    assert [item['status'] for item in items] == [HTTPStatus.OK, HTTPStatus.OK, HTTPStatus.NOT_FOUND]
+    assert items[0]['data']['id'] == 1
+    assert items[2]['data'] is None
+
+
+def test_update_users_batch(app: FastApiApp, created_ids: list[int]):
+    """Пакетное обновление меняет данные существующих пользователей"""
+    missing_id = get_max_user_id() + 1
+    update = [{"id": user_id, "name": "Nikolay", "job": "Super PM"} for user_id in created_ids]
+    response = app.update_users(update + [{"id": missing_id, "name": "Maxim", "job": "driver"}])
+    assert response.status_code == HTTPStatus.OK
+    items = response.json()['items']
+
+    assert [item['status'] for item in items] == [HTTPStatus.OK] * len(created_ids) + [HTTPStatus.NOT_FOUND]
+    for user_id in created_ids:
+        data = app.get_user_by_id(user_id).json()['data']
+        assert data['first_name'] == 'Nikolay'
+        assert data['job'] == 'Super PM'
+
+
+def test_delete_users_batch(app: FastApiApp, created_ids: list[int]):
+    """Пакетное удаление удаляет пользователей и сообщает об отсутствующих"""
+    missing_id = get_max_user_id() + 1
+    response = app.delete_users(created_ids + [missing_id])
+    assert response.status_code == HTTPStatus.OK
+    items = response.json()['items']
+
+    assert [item['status'] for item in items] == [HTTPStatus.NO_CONTENT] * len(created_ids) + [HTTPStatus.NOT_FOUND]
+    for user_id in created_ids:
+        assert app.get_user_by_id(user_id).status_code == HTTPStatus.NOT_FOUND
+
+
+def test_batch_size_limit(app: FastApiApp):
+    """Пакет больше USERS_BATCH_MAX_SIZE отклоняется целиком"""
+    response = app.get_users_by_ids(list(range(1, 1002)))
+    assert response.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
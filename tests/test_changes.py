@@ -0,0 +1,95 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+
+from app.database.changes import ChangeBroadcaster
+from app.models.user import UserData
+from utils.fast_api_app import FastApiApp
+
+
+def make_user(user_id: int) -> UserData:
+    return UserData(id=user_id, email='', first_name='Test', last_name='', avatar='', job='qa')
+
+
+async def take(subscription, count: int) -> list:
+    events = []
+    async for change in subscription.events(heartbeat=0.05):
+        events.append(change)
+        if len(events) == count:
+            break
+    return events
+
+
+def test_subscriber_receives_changes_in_order():
+    broadcaster = ChangeBroadcaster(history_size=100, buffer_size=10)
+
+    async def run():
+        subscription = broadcaster.subscribe()
+        broadcaster.publish('created', 1, make_user(1))
+        broadcaster.publish('updated', 1, make_user(1))
+        broadcaster.publish('deleted', 1)
+        return await take(subscription, 3)
+
+    changes = asyncio.run(run())
+    assert [(change.id, change.type, change.user_id) for change in changes] == [
+        (1, 'created', 1), (2, 'updated', 1), (3, 'deleted', 1)]
+    assert changes[2].data is None
+
+
+def test_resume_replays_missed_changes():
+    """Переподключение с последним полученным id отдаёт пропущенные изменения без пересинхронизации"""
+    broadcaster = ChangeBroadcaster(history_size=100, buffer_size=10)
+    for user_id in range(1, 6):
+        broadcaster.publish('created', user_id, make_user(user_id))
+
+    async def run():
+        subscription = broadcaster.subscribe(after=3)
+        assert subscription.reset_id is None
+        return await take(subscription, 2)
+
+    assert [change.id for change in asyncio.run(run())] == [4, 5]
+
+
+@pytest.mark.parametrize('after', (1, 100))
+def test_resume_outside_history_requires_reset(after: int):
+    broadcaster = ChangeBroadcaster(history_size=2, buffer_size=10)
+    for user_id in range(1, 6):
+        broadcaster.publish('created', user_id, make_user(user_id))
+
+    async def run():
+        return broadcaster.subscribe(after=after)
+
+    subscription = asyncio.run(run())
+    assert subscription.reset_id == 5
+    assert subscription.backlog == []
+
+
+def test_slow_subscriber_dropped():
+    """Переполненная очередь отключает подписчика, остальные и запись не ждут его"""
+    broadcaster = ChangeBroadcaster(history_size=100, buffer_size=2)
+
+    async def run():
+        slow = broadcaster.subscribe()
+        for user_id in range(1, 4):
+            broadcaster.publish('deleted', user_id)
+        return slow, [change.id async for change in slow.events(heartbeat=0.05)]
+
+    slow, received = asyncio.run(run())
+    assert slow.dropped
+    assert received == [1, 2]
+    assert broadcaster.subscribers == 0
+    assert broadcaster.dropped == 1
+
+
+def test_changes_feed_streams_created_user(env: str):
+    app = FastApiApp(env)
+    changes = app.iter_changes()
+    response = app.create_user({"name": "feed user", "job": "QA"})
+    assert response.status_code == HTTPStatus.CREATED
+    user_id = int(response.json()['id'])
+
+    change = next(change for change in changes if change['data']['user_id'] == user_id)
+    changes.close()
+    assert change['event'] == 'created'
+    assert change['data']['data']['first_name'] == 'feed user'
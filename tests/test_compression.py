@@ -0,0 +1,77 @@
+import asyncio
+import gzip
+
+import pytest
+
+from app.routers.compression import CompressionMiddleware, GzipCompressor, negotiate_encoding
+
+BODY = b'{"items":[' + b','.join(b'{"id":%d,"email":"user@reqres.in"}' % i for i in range(200)) + b']}'
+
+
+@pytest.mark.parametrize('accept_encoding, expected', (
+    ('gzip, deflate, br, zstd', 'zstd'),
+    ('gzip;q=1.0, zstd;q=0.5', 'gzip'),
+    ('*', 'zstd'),
+    ('zstd;q=0, *;q=0.1', 'gzip'),
+    ('identity', None),
+    ('', None),
+))
+def test_negotiate_encoding(accept_encoding: str, expected: str | None):
+    """Наибольший q клиента, при равных - порядок сервера"""
+    assert negotiate_encoding(accept_encoding, ['zstd', 'gzip']) == expected
+
+
+def call(body_messages: list[dict], accept_encoding: str = 'gzip', media_type: bytes = b'application/json',
+         min_size: int = 1024) -> tuple[dict, bytes]:
+    async def app(scope, receive, send):
+        headers = [(b'content-type', media_type), (b'etag', b'"abc"')]
+        if not body_messages[0].get('more_body'):
+            headers.append((b'content-length', str(len(body_messages[0]['body'])).encode()))
+        await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+        for message in body_messages:
+            await send({'type': 'http.response.body', **message})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'headers': [(b'accept-encoding', accept_encoding.encode())]}
+    middleware = CompressionMiddleware(app, {'gzip': GzipCompressor}, min_size=min_size)
+    asyncio.run(middleware(scope, None, send))
+    headers = {name.decode(): value.decode() for name, value in sent[0]['headers']}
+    return headers, b''.join(message.get('body', b'') for message in sent[1:])
+
+
+def test_whole_response_compressed():
+    headers, body = call([{'body': BODY}])
+    assert headers['content-encoding'] == 'gzip'
+    assert headers['content-length'] == str(len(body))
+    assert headers['vary'] == 'Accept-Encoding'
+    # ETag остаётся сильным, суффикс кодировки отличает его от ETag несжатого тела
+    assert headers['etag'] == '"abc+gzip"'
+    assert gzip.decompress(body) == BODY
+
+
+def test_small_response_not_compressed():
+    headers, body = call([{'body': BODY}], min_size=len(BODY) + 1)
+    assert 'content-encoding' not in headers
+    assert headers['etag'] == '"abc"'
+    assert body == BODY
+
+
+def test_streamed_response_compressed_by_parts():
+    """Каждая часть потока сжимается и уходит сразу, вместе распаковываются в исходное тело"""
+    parts = [BODY[:100], BODY[100:200], BODY[200:]]
+    headers, body = call([{'body': part, 'more_body': True} for part in parts] + [{'body': b''}])
+    assert headers['content-encoding'] == 'gzip'
+    assert 'content-length' not in headers
+    assert gzip.decompress(body) == BODY
+
+
+@pytest.mark.parametrize('accept_encoding, media_type', (('identity', b'application/json'),
+                                                         ('gzip', b'text/event-stream')))
+def test_response_passed_through(accept_encoding: str, media_type: bytes):
+    headers, body = call([{'body': BODY}], accept_encoding, media_type)
+    assert 'content-encoding' not in headers
+    assert body == BODY
@@ -0,0 +1,137 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from http import HTTPStatus
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, inspect, text
+
+from app.database.engine import create_missing_columns
+from app.routers.conditional import if_match_versions
+from utils.fast_api_app import FastApiApp
+
+
+@pytest.fixture(scope='function')
+def app(env: str):
+    return FastApiApp(env)
+
+
+@pytest.fixture(scope='function')
+def user_id(app: FastApiApp) -> int:
+    response = app.create_user({"name": "tmp user", "job": "PM"})
+    assert response.status_code == HTTPStatus.CREATED
+    return int(response.json()['id'])
+
+
+def test_user_validators(app: FastApiApp, user_id: int):
+    response = app.get_user_by_id(user_id)
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['ETag'] == f'"{user_id}-1"'
+    # версия строки и время изменения передаются только заголовками, в теле - формат reqres
+    assert not {'version', 'updated_at'} & set(response.json()['data'])
+
+    not_modified = app.get_user_by_id(user_id, headers={'If-None-Match': response.headers['ETag']})
+    assert not_modified.status_code == HTTPStatus.NOT_MODIFIED
+    assert not_modified.content == b''
+    assert not_modified.headers['ETag'] == response.headers['ETag']
+
+    not_modified = app.get_user_by_id(user_id, headers={'If-Modified-Since': response.headers['Last-Modified']})
+    assert not_modified.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_update_changes_etag(app: FastApiApp, user_id: int):
+    etag = app.get_user_by_id(user_id).headers['ETag']
+
+    updated = app.update_user(user_id, {"name": "Nikolay", "job": "Super PM"})
+    assert updated.status_code == HTTPStatus.OK
+    assert updated.headers['ETag'] == f'"{user_id}-2"'
+
+    response = app.get_user_by_id(user_id, headers={'If-None-Match': etag})
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['data']['first_name'] == 'Nikolay'
+
+
+def test_update_with_stale_if_match(app: FastApiApp, user_id: int):
+    """Запись по устаревшему ETag отклоняется, по актуальному проходит"""
+    etag = app.get_user_by_id(user_id).headers['ETag']
+    app.update_user(user_id, {"name": "first", "job": "PM"})
+
+    response = app.update_user(user_id, {"name": "second", "job": "PM"}, headers={'If-Match': etag})
+    assert response.status_code == HTTPStatus.PRECONDITION_FAILED
+    assert app.get_user_by_id(user_id).json()['data']['first_name'] == 'first'
+
+    current = app.get_user_by_id(user_id).headers['ETag']
+    response = app.update_user(user_id, {"name": "second", "job": "PM"}, headers={'If-Match': current})
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_weak_if_match_rejected(app: FastApiApp, user_id: int):
+    """If-Match сравнивается строго: слабый ETag текущей версии не разрешает запись"""
+    etag = app.get_user_by_id(user_id).headers['ETag']
+
+    response = app.update_user(user_id, {"name": "weak", "job": "PM"}, headers={'If-Match': f'W/{etag}'})
+    assert response.status_code == HTTPStatus.PRECONDITION_FAILED
+
+    compressed = f'{etag[:-1]}+gzip"'
+    response = app.update_user(user_id, {"name": "strong", "job": "PM"}, headers={'If-Match': compressed})
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_if_match_versions():
+    assert if_match_versions(7, '"7-2", W/"7-3", "7-4.abcd+br", "8-5"') == {2, 4}
+    assert if_match_versions(7, '*') is None
+    with pytest.raises(HTTPException):
+        if_match_versions(7, 'W/"7-2"')
+
+
+def test_delete_with_stale_if_match(app: FastApiApp, user_id: int):
+    etag = app.get_user_by_id(user_id).headers['ETag']
+    app.update_user(user_id, {"name": "changed", "job": "PM"})
+
+    response = app.delete_user(user_id, headers={'If-Match': etag})
+    assert response.status_code == HTTPStatus.PRECONDITION_FAILED
+
+    response = app.delete_user(user_id, headers={'If-Match': app.get_user_by_id(user_id).headers['ETag']})
+    assert response.status_code == HTTPStatus.NO_CONTENT
+
+
+@pytest.mark.parametrize('params', [{'page': 1, 'size': 5}, {'pagination': 'cursor', 'size': 5}])
+def test_page_not_modified_until_user_changes(app: FastApiApp, params: dict):
+    response = app.get_all_users(params)
+    etag = response.headers['ETag']
+    assert app.get_all_users(params, headers={'If-None-Match': etag}).status_code == HTTPStatus.NOT_MODIFIED
+
+    first = response.json()['items'][0]
+    app.update_user(first['id'], {"name": first['first_name'], "job": first['job']})
+    assert app.get_all_users(params, headers={'If-None-Match': etag}).status_code == HTTPStatus.OK
+
+
+def test_missing_columns_added_to_existing_table(tmp_path):
+    """Таблица, созданная до появления updated_at и version, дополняется ими без потери строк"""
+    engine = create_engine(f'sqlite:///{tmp_path}/old.db')
+    with engine.begin() as connection:
+        connection.execute(text('CREATE TABLE userdata (id INTEGER PRIMARY KEY, email VARCHAR NOT NULL, '
+                                'first_name VARCHAR NOT NULL, last_name VARCHAR NOT NULL, '
+                                'avatar VARCHAR NOT NULL, job VARCHAR NOT NULL)'))
+        connection.execute(text("INSERT INTO userdata VALUES (1, 'a@reqres.in', 'A', 'B', '', '')"))
+        create_missing_columns(connection)
+
+        assert {'updated_at', 'version'} <= {column['name'] for column in inspect(connection).get_columns('userdata')}
+        version, updated_at = connection.execute(text('SELECT version, updated_at FROM userdata')).one()
+    assert version == 1
+    assert updated_at is not None
+
+
+def test_page_ignores_if_modified_since(app: FastApiApp):
+    """Удаление пользователя не меняет max(updated_at) страницы, поэтому страница проверяется только по ETag"""
+    created = [app.create_user({"name": "page user", "job": "ims-check"}).json()['id'] for _ in range(2)]
+    params = {'job': 'ims-check', 'page': 1, 'size': 5}
+    response = app.get_all_users(params)
+    assert 'Last-Modified' not in response.headers
+
+    app.delete_user(int(created[0]))
+    since = format_datetime(datetime.now(timezone.utc), usegmt=True)
+    response = app.get_all_users(params, headers={'If-Modified-Since': since})
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['total'] == 1
+    app.delete_user(int(created[1]))
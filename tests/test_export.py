@@ -0,0 +1,59 @@
+from http import HTTPStatus
+
+import anyio
+import pytest
+
+from app.database import async_users
+from app.database.data import users_data
+from app.database.engine import async_engine
+from app.database.users import count_users
+from app.models.user import UserCreateData
+from tests.helpers import run_async
+from utils.fast_api_app import FastApiApp
+
+
+@pytest.fixture(scope='function')
+def app(env: str):
+    return FastApiApp(env)
+
+
+def test_export_ndjson_all_users(app: FastApiApp):
+    """Выгрузка NDJSON возвращает всех пользователей по возрастанию id"""
+    exported = list(app.iter_exported_users())
+    ids = [user['id'] for user in exported]
+
+    assert len(exported) == count_users()
+    assert ids == sorted(ids)
+    assert exported[0]['email'] == users_data[1].email
+
+
+@pytest.mark.parametrize('export_format', ('ndjson', 'csv'))
+def test_export_id_range(app: FastApiApp, export_format: str):
+    """Фильтр по диапазону id ограничивает выгрузку"""
+    exported = list(app.iter_exported_users({'format': export_format, 'id_from': 3, 'id_to': 5}))
+
+    assert [int(user['id']) for user in exported] == [3, 4, 5]
+    assert [user['last_name'] for user in exported] == [users_data[i].last_name for i in (3, 4, 5)]
+
+
+def test_export_content_type(app: FastApiApp):
+    with app.export_users({'format': 'csv', 'id_to': 1}) as response:
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers['content-type'].startswith('text/csv')
+        assert 'content-length' not in response.headers
+
+
+def test_dropped_export_returns_connection():
+    """Выгрузка, закрытая посреди потока в отменённой области, возвращает соединение в пул, запись проходит"""
+    async def run():
+        chunks = async_users.iter_users(chunk_size=1)
+        assert len(await anext(chunks)) == 1
+        with anyio.CancelScope() as scope:
+            scope.cancel()
+            await chunks.aclose()
+        checked_out = async_engine.sync_engine.pool.checkedout()
+        user = await async_users.create_user_from_api_request(UserCreateData(name='tmp user', job='PM'))
+        await async_users.delete_user(user.id)
+        return checked_out
+
+    assert run_async(run()) == 0
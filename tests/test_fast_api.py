@@ -144,3 +144,35 @@ class TestCRUD:
         """Удаление пользователя с невалидным id"""
         delete_response = app.delete_user(user_id)
         assert delete_response.status_code == HTTPStatus.UNPROCESSABLE_CONTENT
+
+
+class TestUserCache:
+
+    def test_updated_user_not_stale(self, app: FastApiApp, create_user_id: int):
+        """Повторное чтение после обновления возвращает новые данные, а не закэшированные"""
+        assert app.get_user_by_id(create_user_id).status_code == HTTPStatus.OK
+
+        app.update_user(create_user_id, {"name": "Cached", "job": "invalidated"})
+
+        data = app.get_user_by_id(create_user_id).json()['data']
+        assert data['first_name'] == 'Cached'
+        assert data['job'] == 'invalidated'
+
+    def test_deleted_user_not_served_from_cache(self, app: FastApiApp, create_user_id: int):
+        """После удаления закэшированный пользователь не возвращается"""
+        assert app.get_user_by_id(create_user_id).status_code == HTTPStatus.OK
+
+        app.delete_user(create_user_id)
+
+        assert app.get_user_by_id(create_user_id).status_code == HTTPStatus.NOT_FOUND
+
+    def test_created_user_not_hidden_by_negative_cache(self, app: FastApiApp):
+        """Закэшированный 404 для следующего id не скрывает только что созданного пользователя"""
+        next_id = get_max_user_id() + 1
+        assert app.get_user_by_id(next_id).status_code == HTTPStatus.NOT_FOUND
+
+        response = app.create_user({"name": "tmp user", "job": "PM"})
+        assert response.status_code == HTTPStatus.CREATED
+        new_id = int(response.json()['id'])
+
+        assert app.get_user_by_id(new_id).status_code == HTTPStatus.OK
@@ -0,0 +1,55 @@
+from http import HTTPStatus
+
+import pytest
+
+from app.database.data import users_data
+from utils.fast_api_app import FastApiApp
+
+
+@pytest.fixture(scope='function')
+def app(env: str):
+    return FastApiApp(env)
+
+
+def test_user_fields(app: FastApiApp):
+    """В data только запрошенные поля, блок support на месте"""
+    response = app.get_user_by_id(1, params={'fields': 'email,id'})
+    assert response.status_code == HTTPStatus.OK
+    body = response.json()
+
+    assert body['data'] == {'id': 1, 'email': users_data[1].email}
+    assert 'support' in body
+
+
+def test_user_without_support(app: FastApiApp):
+    body = app.get_user_by_id(1, params={'include_support': 'false'}).json()
+    assert set(body) == {'data'}
+    assert body['data']['avatar'] == users_data[1].avatar
+
+
+def test_projected_user_etag_differs(app: FastApiApp):
+    """Неполное представление имеет свой ETag, 304 по нему отдаётся только для того же набора полей"""
+    full = app.get_user_by_id(1)
+    projected = app.get_user_by_id(1, params={'fields': 'id,email'})
+    assert projected.headers['ETag'] != full.headers['ETag']
+
+    etag = {'If-None-Match': projected.headers['ETag']}
+    assert app.get_user_by_id(1, headers=etag, params={'fields': 'id,email'}).status_code == HTTPStatus.NOT_MODIFIED
+    assert app.get_user_by_id(1, headers=etag).status_code == HTTPStatus.OK
+
+
+@pytest.mark.parametrize('params', ({'page': 1, 'size': 5}, {'pagination': 'cursor', 'size': 5}))
+def test_page_fields(app: FastApiApp, params: dict):
+    """Конверт страницы не меняется, пользователи в items - только с запрошенными полями"""
+    full = app.get_all_users(params=params).json()
+    response = app.get_all_users(params={**params, 'fields': 'id,email'})
+    assert response.status_code == HTTPStatus.OK
+    body = response.json()
+
+    assert set(body) == set(full)
+    assert body['items'] == [{'id': user['id'], 'email': user['email']} for user in full['items']]
+
+
+def test_unknown_field(app: FastApiApp):
+    response = app.get_all_users(params={'fields': 'id,password'})
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
@@ -77,3 +77,71 @@ def test_results_items_by_page_change(app: FastApiApp):
     assert not (users_ids_one & users_ids_two)
     assert body_one['page'] != body_two['page']
     assert body_one['size'] == body_two['size'] == size
+
+
+def test_cursor_pagination_walks_all_users(app: FastApiApp, current_count_users: int):
+    """Проверить, что обход по курсору next возвращает всех пользователей без повторов и без total"""
+    size = 5
+    params = {'pagination': 'cursor', 'size': size}
+    users_ids = []
+    while True:
+        response = app.get_all_users(params=params)
+        assert response.status_code == HTTPStatus.OK
+        body = response.json()
+        assert 'total' not in body
+        assert len(body['items']) <= size
+        users_ids.extend(user['id'] for user in body['items'])
+        if not body['next']:
+            break
+        params = {'cursor': body['next'], 'size': size}
+
+    assert users_ids == sorted(users_ids)
+    assert len(users_ids) == len(set(users_ids)) == current_count_users
+
+
+def test_cursor_pagination_previous_page(app: FastApiApp):
+    """Проверить, что курсор previous возвращает предыдущую страницу"""
+    size = 3
+    first_page = app.get_all_users(params={'pagination': 'cursor', 'size': size}).json()
+    assert first_page['previous'] is None
+    second_page = app.get_all_users(params={'cursor': first_page['next'], 'size': size}).json()
+    assert second_page['previous']
+
+    response = app.get_all_users(params={'cursor': second_page['previous'], 'size': size})
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['items'] == first_page['items']
+
+
+def test_cursor_pagination_not_valid_cursor(app: FastApiApp):
+    """Проверить ответ на невалидный курсор"""
+    response = app.get_all_users(params={'cursor': 'not-a-cursor'})
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_CONTENT
+    assert response.json()['detail'] == 'Invalid cursor'
+
+
+@pytest.mark.parametrize('count', ('exact', 'cached'))
+def test_total_by_count_strategy(app: FastApiApp, count: str):
+    """Проверить, что точные стратегии подсчёта total совпадают с количеством пользователей в БД"""
+    response = app.get_all_users(params={'size': 1, 'count': count})
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['total'] == count_users()
+
+
+def test_cached_total_after_create_and_delete(app: FastApiApp):
+    """Проверить, что закэшированный total учитывает создание и удаление пользователя"""
+    total_before = app.get_all_users(params={'size': 1, 'count': 'cached'}).json()['total']
+
+    user_id = app.create_user({"name": "tmp user", "job": "PM"}).json()['id']
+    assert app.get_all_users(params={'size': 1, 'count': 'cached'}).json()['total'] == total_before + 1
+
+    app.delete_user(user_id)
+    assert app.get_all_users(params={'size': 1, 'count': 'cached'}).json()['total'] == total_before
+
+
+def test_estimated_total(app: FastApiApp):
+    """Проверить, что оценка total возвращается и страницы считаются от неё"""
+    response = app.get_all_users(params={'size': 5, 'count': 'estimate'})
+    assert response.status_code == HTTPStatus.OK
+    body = response.json()
+    assert body['total'] >= 0
+    assert body['pages'] == math.ceil(body['total'] / 5)
@@ -0,0 +1,110 @@
+import asyncio
+
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.database.sessions import SessionScope, request_sessions
+from app.models.user import UserData
+from app.monitoring.profiling import ProfilingMiddleware, RequestProfiler
+from app.monitoring.slow_queries import SlowQueryLog, db_operation
+
+
+def test_slow_query_recorded_with_plan_and_tags(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path}/slow.db')
+    SQLModel.metadata.create_all(engine)
+    log = SlowQueryLog(threshold=0, explain=True, size=10)
+    log.instrument(engine, 'test')
+
+    scope_token = request_sessions.set(SessionScope('GET /api/users/', 'get_users'))
+    operation_token = db_operation.set('get_users_page')
+    try:
+        with Session(engine) as session:
+            session.exec(select(UserData).where(UserData.job == 'qa').limit(5)).all()
+    finally:
+        db_operation.reset(operation_token)
+        request_sessions.reset(scope_token)
+
+    entry = log.entries[-1]
+    assert entry.statement.startswith('SELECT')
+    assert "'qa'" in entry.parameters
+    assert (entry.engine, entry.route, entry.operation) == ('test', 'get_users', 'get_users_page')
+    assert entry.bind_ms is not None
+    assert any('ix_userdata_job' in line for line in entry.plan)
+
+
+def test_fast_queries_not_recorded(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path}/fast.db')
+    SQLModel.metadata.create_all(engine)
+    log = SlowQueryLog(threshold=10_000, explain=True, size=10)
+    log.instrument(engine, 'test')
+
+    with Session(engine) as session:
+        session.exec(select(UserData)).all()
+    assert not log.entries
+
+
+def test_failed_explain_rolled_back_to_savepoint():
+    """В Postgres ошибка EXPLAIN прерывает транзакцию, поэтому он выполняется в точке сохранения"""
+    executed = []
+
+    class Cursor:
+        def execute(self, statement, parameters=None):
+            executed.append(statement.split()[0] if statement.startswith('EXPLAIN') else statement)
+            if statement.startswith('EXPLAIN'):
+                raise RuntimeError('cannot explain')
+
+        def close(self):
+            pass
+
+    class Connection:
+        dialect = type('Dialect', (), {'name': 'postgresql'})
+        connection = type('DBAPIConnection', (), {'cursor': lambda self: Cursor()})()
+
+        def in_transaction(self):
+            return True
+
+    log = SlowQueryLog(threshold=0, explain=True, size=10)
+    assert log._explain(Connection(), 'SELECT 1', ()) is None
+    assert executed == ['SAVEPOINT slow_query_explain', 'EXPLAIN', 'ROLLBACK TO SAVEPOINT slow_query_explain',
+                        'RELEASE SAVEPOINT slow_query_explain']
+
+
+def call(middleware, headers: list) -> dict:
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(middleware({'type': 'http', 'method': 'GET', 'path': '/api/users/', 'headers': headers}, None, send))
+    return dict(messages[0]['headers'])
+
+
+async def endpoint(scope, receive, send):
+    sum(range(1000))
+    await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+def test_profile_requested_by_token():
+    """Запрос с верным токеном профилируется, без него и с неверным - нет"""
+    profiler = RequestProfiler(token='secret', sample_rate=0, top=10, history=5)
+    middleware = ProfilingMiddleware(endpoint, profiler)
+
+    assert b'x-profile-id' not in call(middleware, [])
+    assert b'x-profile-id' not in call(middleware, [(b'x-profile', b'wrong')])
+    headers = call(middleware, [(b'x-profile', b'secret')])
+
+    profile = profiler.get(int(headers[b'x-profile-id']))
+    assert profile.path == '/api/users/'
+    assert profile.status == 200
+    assert not profile.sampled
+    assert 'endpoint' in profile.summary
+
+
+def test_sampled_profiles():
+    profiler = RequestProfiler(token='', sample_rate=1, top=10, history=2)
+    middleware = ProfilingMiddleware(endpoint, profiler)
+    for _ in range(3):
+        call(middleware, [(b'x-profile', b'')])
+
+    assert [profile.id for profile in profiler.profiles] == [2, 3]
+    assert all(profile.sampled for profile in profiler.profiles)
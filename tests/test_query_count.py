@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.database import async_users, users
+from app.database.engine import async_engine, engine
+from app.models.user import UserBatchUpdateData, UserCreateData
+from tests.helpers import count_queries, run_async
+
+
+@pytest.fixture(scope='function')
+def user_id() -> int:
+    return users.create_user_from_api_request(UserCreateData(name='tmp user', job='PM')).id
+
+
+def test_create_user_single_round_trip():
+    with count_queries(engine) as counter:
+        users.create_user_from_api_request(UserCreateData(name='tmp user', job='PM'))
+    assert counter == {'statements': 1, 'checkouts': 1}
+
+
+def test_update_user_single_round_trip(user_id: int):
+    with count_queries(engine) as counter:
+        updated = users.update_user(user_id, UserCreateData(name='Nikolay', job='Super PM'))
+    assert counter == {'statements': 1, 'checkouts': 1}
+    assert updated.first_name == 'Nikolay'
+
+
+def test_delete_user_single_round_trip(user_id: int):
+    with count_queries(engine) as counter:
+        users.delete_user(user_id)
+    assert counter == {'statements': 1, 'checkouts': 1}
+
+
+def test_update_not_exist_user_single_round_trip():
+    user_id = users.get_max_user_id() + 1
+    with count_queries(engine) as counter:
+        with pytest.raises(HTTPException) as error:
+            users.update_user(user_id, UserCreateData(name='Maxim', job='driver'))
+    assert error.value.status_code == 404
+    assert counter == {'statements': 1, 'checkouts': 1}
+
+
+def test_async_write_path_single_round_trip():
+    async def create_update_delete() -> list[dict]:
+        counters = []
+        with count_queries(async_engine.sync_engine) as counter:
+            user = await async_users.create_user_from_api_request(UserCreateData(name='tmp user', job='PM'))
+        counters.append(dict(counter))
+        with count_queries(async_engine.sync_engine) as counter:
+            await async_users.update_user(user.id, UserCreateData(name='Nikolay', job='Super PM'))
+        counters.append(dict(counter))
+        with count_queries(async_engine.sync_engine) as counter:
+            await async_users.delete_user(user.id)
+        counters.append(dict(counter))
+        return counters
+
+    assert run_async(create_update_delete()) == [{'statements': 1, 'checkouts': 1}] * 3
+
+
+def test_concurrent_batch_updates_get_distinct_versions():
+    """Пакетное обновление - одно выражение, одновременные пакеты по одним id не получают одинаковую версию"""
+    async def run() -> tuple[dict, list[int]]:
+        created = await async_users.create_users([UserCreateData(name='tmp user', job='PM')] * 2)
+        ids = [user.id for user in created]
+        with count_queries(async_engine.sync_engine) as counter:
+            await async_users.update_users([UserBatchUpdateData(id=user_id, name='A', job='QA') for user_id in ids])
+        results = await asyncio.gather(*(
+            async_users.update_users([UserBatchUpdateData(id=user_id, name=name, job='QA') for user_id in ids])
+            for name in ('B', 'C')))
+        await async_users.delete_users(ids)
+        return dict(counter), sorted(result[ids[0]].version for result in results)
+
+    counter, versions = run_async(run())
+    assert counter == {'statements': 1, 'checkouts': 1}
+    assert versions == [3, 4]
@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.database.routing import STICKY_COOKIE, ReadRouter, ReadYourWritesMiddleware, prefer_primary
+from app.models.user import UserData
+
+
+def make_engine(path, email: str):
+    engine = create_engine(f'sqlite:///{path}')
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(UserData(email=email, first_name='Test', last_name='User', avatar='', job='qa'))
+        session.commit()
+    return engine
+
+
+def read_email(session: Session) -> str:
+    return session.exec(select(UserData.email)).first()
+
+
+@pytest.fixture
+def router(tmp_path) -> ReadRouter:
+    return ReadRouter(make_engine(tmp_path / 'primary.db', 'primary@test.io'),
+                      make_engine(tmp_path / 'replica.db', 'replica@test.io'))
+
+
+def test_reads_go_to_replica(router):
+    assert router.run(read_email) == 'replica@test.io'
+
+
+def test_prefer_primary_reads_from_primary(router):
+    token = prefer_primary.set(True)
+    try:
+        assert router.run(read_email) == 'primary@test.io'
+    finally:
+        prefer_primary.reset(token)
+
+
+def test_unavailable_replica_falls_back_to_primary(tmp_path):
+    """Недоступная реплика помечается и чтение повторяется на primary"""
+    primary = make_engine(tmp_path / 'primary.db', 'primary@test.io')
+    replica = create_engine(f'sqlite:///{tmp_path}/missing/replica.db')
+    router = ReadRouter(primary, replica, retry_after=60)
+
+    assert router.run(read_email) == 'primary@test.io'
+    assert not router.replica_available
+    assert router.read_engine() is primary
+
+
+def test_sticky_cookie_after_write():
+    """После записи клиент получает cookie, а с ней чтения идут в primary"""
+    seen = []
+
+    async def app(scope, receive, send):
+        seen.append(prefer_primary.get())
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def call(method: str, headers: list) -> list:
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        middleware = ReadYourWritesMiddleware(app, window=5)
+        await middleware({'type': 'http', 'method': method, 'headers': headers}, None, send)
+        return messages[0]['headers']
+
+    response_headers = asyncio.run(call('POST', []))
+    cookie = dict(response_headers)[b'set-cookie'].decode()
+    assert cookie.startswith(f'{STICKY_COOKIE}=')
+
+    assert asyncio.run(call('GET', [(b'cookie', cookie.split(';')[0].encode())])) == []
+    expired = f'{STICKY_COOKIE}={time.time() - 1}'.encode()
+    asyncio.run(call('GET', [(b'cookie', expired)]))
+    assert seen == [False, True, False]
@@ -0,0 +1,88 @@
+from http import HTTPStatus
+
+import pytest
+from sqlmodel import select
+
+from app.database.engine import engine
+from app.database.search import apply_user_filters
+from app.models.user import UserData, UserFilter
+from utils.fast_api_app import FastApiApp
+
+
+@pytest.fixture(scope='function')
+def app(env: str):
+    return FastApiApp(env)
+
+
+def explain(filters: UserFilter) -> str:
+    """План запроса списка пользователей с фильтрами; в Postgres seq scan запрещён, чтобы план
+    не зависел от размера тестовой таблицы"""
+    statement = apply_user_filters(select(UserData).order_by(UserData.id), filters, engine.dialect.name)
+    query = str(statement.compile(engine, compile_kwargs={'literal_binds': True}))
+    with engine.connect() as connection:
+        if engine.dialect.name == 'postgresql':
+            connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+            rows = connection.exec_driver_sql(f'EXPLAIN {query}').all()
+        else:
+            rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {query}').all()
+    return '\n'.join(str(row[-1]) for row in rows)
+
+
+@pytest.mark.parametrize('filters, index_name', [
+    (UserFilter(email='george.bluth@reqres.in'), 'uq_userdata_email'),
+    (UserFilter(first_name='Geo'), 'ix_userdata_first_name_lower'),
+    (UserFilter(last_name='fun'), 'ix_userdata_last_name_lower'),
+    (UserFilter(job='qa-auto'), 'ix_userdata_job'),
+])
+def test_filter_uses_index(filters: UserFilter, index_name: str):
+    """Каждый фильтр выполняется по своему индексу, а не полным проходом по таблице"""
+    assert index_name in explain(filters)
+
+
+def test_filter_by_email(app: FastApiApp):
+    response = app.get_all_users(params={'email': 'janet.weaver@reqres.in'})
+    assert response.status_code == HTTPStatus.OK
+    body = response.json()
+    assert [user['id'] for user in body['items']] == [2]
+    assert body['total'] == 1
+
+
+def test_filter_by_first_name_prefix_ignore_case(app: FastApiApp):
+    response = app.get_all_users(params={'first_name': 'gEO'})
+    assert response.status_code == HTTPStatus.OK
+    items = response.json()['items']
+    assert {user['email'] for user in items} == {'george.bluth@reqres.in', 'george.edwards@reqres.in'}
+
+
+def test_combined_filters(app: FastApiApp):
+    response = app.get_all_users(params={'last_name': 'FUN', 'first_name': 'tob'})
+    assert response.status_code == HTTPStatus.OK
+    items = response.json()['items']
+    assert [user['email'] for user in items] == ['tobias.funke@reqres.in']
+
+
+def test_filter_with_pagination(app: FastApiApp):
+    response = app.get_all_users(params={'first_name': 'george', 'size': 1, 'page': 2})
+    assert response.status_code == HTTPStatus.OK
+    body = response.json()
+    assert body['total'] == 2
+    assert body['pages'] == 2
+    assert [user['email'] for user in body['items']] == ['george.edwards@reqres.in']
+
+
+def test_filter_by_job(app: FastApiApp):
+    job = 'search-by-job'
+    user_id = int(app.create_user({'name': 'tmp user', 'job': job}).json()['id'])
+
+    items = app.get_all_users(params={'job': job}).json()['items']
+    assert [user['id'] for user in items] == [user_id]
+
+
+def test_filter_with_cursor_pagination(app: FastApiApp):
+    response = app.get_all_users(params={'pagination': 'cursor', 'first_name': 'george', 'size': 1})
+    body = response.json()
+    assert [user['email'] for user in body['items']] == ['george.bluth@reqres.in']
+
+    body = app.get_all_users(params={'cursor': body['next'], 'first_name': 'george', 'size': 1}).json()
+    assert [user['email'] for user in body['items']] == ['george.edwards@reqres.in']
+    assert body['next'] is None
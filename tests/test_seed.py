@@ -0,0 +1,93 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func, text
+from sqlmodel import Session, create_engine, select
+
+from app.database import seed
+from app.database.data import users_data
+from app.database.engine import engine, existing_indexes
+from app.database.seed import seed_database
+from app.models.user import UserData
+from tests.helpers import count_queries
+
+
+def count_seeded_users(db_engine=engine) -> dict[str, int]:
+    emails = [user.email for user in users_data.values()]
+    with Session(db_engine) as session:
+        statement = select(UserData.email, func.count()).where(UserData.email.in_(emails)).group_by(UserData.email)
+        return dict(session.exec(statement).all())
+
+
+def test_seed_is_idempotent():
+    """Повторный запуск заполнения не создаёт копии начальных пользователей"""
+    seed_database()
+    seed_database()
+
+    assert count_seeded_users() == {user.email: 1 for user in users_data.values()}
+
+
+def test_concurrent_seed():
+    """Одновременный старт нескольких воркеров не создаёт копии начальных пользователей"""
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: seed_database(), range(4)))
+
+    assert count_seeded_users() == {user.email: 1 for user in users_data.values()}
+
+
+def test_seed_skips_ddl_when_schema_current():
+    """Перезапуск на текущей схеме с начальными пользователями выполняет только проверку, без DDL и вставки"""
+    seed_database()
+    with count_queries(engine) as counter:
+        seed_database()
+
+    assert counter == {'statements': 2, 'checkouts': 1}
+
+
+def create_old_users_table(db_engine, rows: list[dict]):
+    """Таблица пользователей до появления индекса email, updated_at и version"""
+    columns = ('email', 'first_name', 'last_name', 'avatar', 'job')
+    with db_engine.begin() as connection:
+        connection.execute(text('CREATE TABLE userdata (id INTEGER PRIMARY KEY, email VARCHAR NOT NULL, '
+                                'first_name VARCHAR NOT NULL, last_name VARCHAR NOT NULL, '
+                                'avatar VARCHAR NOT NULL, job VARCHAR NOT NULL)'))
+        connection.execute(text(f"INSERT INTO userdata ({', '.join(columns)}) "
+                                f"VALUES ({', '.join(':' + column for column in columns)})"), rows)
+
+
+def seed_rows() -> list[dict]:
+    return [user.model_dump(include={'email', 'first_name', 'last_name', 'avatar', 'job'})
+            for user in users_data.values()]
+
+
+def test_seed_on_table_with_duplicated_seed_users(tmp_path, monkeypatch):
+    """БД, где начальные пользователи вставлялись при каждом запуске: копии удаляются, индекс email создаётся"""
+    old_engine = create_engine(f'sqlite:///{tmp_path}/old.db')
+    rows = seed_rows()
+    create_old_users_table(old_engine, rows + rows + [{**rows[0], 'email': ''}, {**rows[0], 'email': ''}])
+    monkeypatch.setattr(seed, 'get_engine', lambda: old_engine)
+
+    seed_database()
+
+    assert count_seeded_users(old_engine) == {user.email: 1 for user in users_data.values()}
+    with old_engine.connect() as connection:
+        assert seed.EMAIL_INDEX in existing_indexes(connection, 'userdata')
+        # пустой email у пользователей из API не считается копией
+        assert connection.execute(text("SELECT count(*) FROM userdata WHERE email = ''")).scalar() == 2
+
+
+def test_seed_keeps_edited_duplicate(tmp_path, monkeypatch, caplog):
+    """Изменённая копия начального пользователя не удаляется: индекс не создаётся, оператору пишется ошибка"""
+    old_engine = create_engine(f'sqlite:///{tmp_path}/old.db')
+    rows = seed_rows()
+    create_old_users_table(old_engine, rows + [{**rows[0], 'job': 'edited'}])
+    monkeypatch.setattr(seed, 'get_engine', lambda: old_engine)
+
+    seed_database()
+
+    with old_engine.connect() as connection:
+        jobs = connection.execute(text('SELECT job FROM userdata WHERE email = :email ORDER BY id'),
+                                  {'email': rows[0]['email']}).scalars().all()
+        assert jobs == ['', 'edited']
+        assert seed.EMAIL_INDEX not in existing_indexes(connection, 'userdata')
+        assert not seed.is_seeded(connection, seed.schema_fingerprint(old_engine.dialect))
+    assert rows[0]['email'] in caplog.text
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi_pagination import Page
+from pydantic import TypeAdapter
+
+from app.database.data import users_data
+from app.models.support import support_data
+from app.models.user import PublicUserData, UserData, UserResponse, UserCreateResponse, UserUpdatedResponse
+from app.routers import responses
+from app.routers.responses import created_response, page_response, updated_response, user_response
+
+
+def default_body(model_type, content) -> bytes:
+    """Тело ответа так, как его собирает FastAPI по response_model"""
+    adapter = TypeAdapter(model_type)
+    return JSONResponse(adapter.dump_python(adapter.validate_python(content), mode='json')).body
+
+
+@pytest.fixture(scope='module')
+def user() -> UserData:
+    return UserData(id=7, email='алиса@reqres.in', first_name='Алиса "Alice"', last_name='Ivanova\n',
+                    avatar='https://reqres.in/img/faces/7-image.jpg', job='qa/auto')
+
+
+def test_user_response_byte_compatible(user: UserData):
+    expected = default_body(UserResponse, UserResponse(data=user, support=support_data).model_dump())
+    assert user_response(user).body == expected
+
+
+@pytest.mark.parametrize('total, page, size', ((12, 1, 5), (12, 3, 5), (0, 1, 50)))
+def test_page_response_byte_compatible(user: UserData, total: int, page: int, size: int):
+    items = [user, *[UserData(id=user_id, **data.model_dump(exclude={'id'})) for user_id, data in users_data.items()]]
+    items = items[:size] if total else []
+    pages = -(-total // size)
+    public = set(PublicUserData.model_fields)
+    expected = default_body(Page[PublicUserData], {'items': [item.model_dump(include=public) for item in items],
+                                                   'total': total, 'page': page, 'size': size, 'pages': pages})
+    assert page_response(items, total, page, size).body == expected
+
+
+def test_created_and_updated_response_byte_compatible():
+    created_at = '2025-03-31T12:00:00.000Z'
+    expected = default_body(UserCreateResponse, {'name': 'Алиса', 'job': 'qa', 'id': '13', 'createdAt': created_at})
+    response = created_response('Алиса', 'qa', 13, created_at)
+    assert response.body == expected
+    assert response.status_code == 201
+
+    expected = default_body(UserUpdatedResponse, {'name': 'Max', 'job': 'PM', 'updatedAt': created_at})
+    assert updated_response('Max', 'PM', created_at).body == expected
+
+
+@pytest.mark.parametrize('count', (0, 3, 12))
+def test_streamed_page_byte_compatible(monkeypatch, user: UserData, count: int):
+    """Страница потоком по частям совпадает побайтово со страницей одним буфером"""
+    items = [UserData(id=user_id, **user.model_dump(exclude={'id'})) for user_id in range(1, count + 1)]
+    expected = page_response(items, 100, 1, 50).body
+    monkeypatch.setattr(responses, 'USERS_PAGE_STREAM_THRESHOLD', -1)
+    monkeypatch.setattr(responses, 'USERS_PAGE_STREAM_CHUNK', 5)
+
+    response = page_response(items, 100, 1, 50)
+    assert isinstance(response, StreamingResponse)
+
+    async def read_body() -> bytes:
+        return b''.join([chunk async for chunk in response.body_iterator])
+
+    assert asyncio.run(read_body()) == expected
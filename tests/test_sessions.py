@@ -0,0 +1,92 @@
+import logging
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.database import async_users
+from app.database.cache import user_cache
+from app.database.data import users_data
+from app.database.engine import async_engine
+from app.database.sessions import SessionScope, request_sessions
+from app.models.user import UserCreateData, UserData
+from app.monitoring.leaks import ConnectionLeakTracker
+from tests.helpers import count_queries, run_async
+
+
+def test_request_scope_shares_one_connection():
+    """Чтения и запись одного запроса выполняются через одно соединение пула, закрываемое вместе с запросом"""
+    user_cache.invalidate(1)
+
+    async def request():
+        scope = SessionScope('test')
+        token = request_sessions.set(scope)
+        try:
+            with count_queries(async_engine.sync_engine) as counter:
+                await async_users.get_user(1)
+                await async_users.get_users_page(0, 5)
+                await async_users.count_users()
+                user = await async_users.create_user_from_api_request(UserCreateData(name='tmp user', job='PM'))
+                await async_users.delete_user(user.id)
+                await scope.close()
+            return counter, async_engine.sync_engine.pool.checkedout()
+        finally:
+            request_sessions.reset(token)
+
+    counter, checked_out = run_async(request())
+    assert counter['checkouts'] == 1
+    assert checked_out == 0
+
+
+def test_write_error_discards_request_session():
+    """После ошибки следующий блок запроса получает новую сессию"""
+
+    async def request():
+        scope = SessionScope('test')
+        token = request_sessions.set(scope)
+        try:
+            duplicate = UserData(**users_data[1].model_dump(exclude={'id'}))
+            with pytest.raises(IntegrityError):
+                await async_users.create_user(duplicate)
+            assert [user.id for user in await async_users.get_users_page(0, 1)] == [1]
+            await scope.close()
+        finally:
+            request_sessions.reset(token)
+
+    run_async(request())
+
+
+def test_closed_scope_falls_back_to_own_session():
+    """Задача single-flight, начавшая чтение после закрытия сессий запроса, не оставляет соединение открытым"""
+    user_cache.invalidate(1)
+
+    async def request():
+        scope = SessionScope('test')
+        token = request_sessions.set(scope)
+        try:
+            await scope.close()
+            assert (await async_users.get_user(1)).id == 1
+            return scope._sessions, async_engine.sync_engine.pool.checkedout()
+        finally:
+            request_sessions.reset(token)
+
+    sessions, checked_out = run_async(request())
+    assert sessions == {}
+    assert checked_out == 0
+
+
+def test_connection_held_past_threshold_reported(tmp_path, caplog):
+    engine = create_engine(f'sqlite:///{tmp_path}/leaks.db')
+    SQLModel.metadata.create_all(engine)
+    tracker = ConnectionLeakTracker(threshold=0)
+    tracker.track(engine, 'test')
+
+    session = Session(engine)
+    session.connection()
+    with caplog.at_level(logging.WARNING):
+        assert tracker.check() == 1
+        assert tracker.check() == 0
+    assert 'possible leak' in caplog.text
+    session.close()
+    assert tracker.checked_out == 0
+    assert tracker.leaks == 1
@@ -0,0 +1,95 @@
+import asyncio
+
+from app.database import async_users
+from app.database.cache import MemoryCache, UserCache, user_cache
+from app.database.engine import async_engine
+from app.database.singleflight import SingleFlight
+from app.models.user import UserData
+from tests.helpers import count_queries, run_async
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 'value'
+
+    async def run():
+        return await asyncio.gather(*(flight.do(('user', 1), load) for _ in range(10)))
+
+    assert asyncio.run(run()) == ['value'] * 10
+    assert len(calls) == 1
+    assert flight.leaders['user'] == 1
+    assert flight.coalesced['user'] == 9
+
+
+def test_error_propagates_to_every_waiter():
+    flight = SingleFlight()
+
+    async def load():
+        await asyncio.sleep(0.05)
+        raise RuntimeError('db is down')
+
+    async def run():
+        return await asyncio.gather(*(flight.do(('page', 0, 10), load) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_call_after_forget_starts_new_execution():
+    """После записи новые чтения не получают результат чтения, начатого до неё"""
+    flight = SingleFlight()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        call_number = len(calls)
+        await asyncio.sleep(0.05)
+        return call_number
+
+    async def run():
+        first = asyncio.ensure_future(flight.do(('user', 1), load))
+        await asyncio.sleep(0)
+        flight.forget('user', 1)
+        return await asyncio.gather(first, flight.do(('user', 1), load))
+
+    assert asyncio.run(run()) == [1, 2]
+
+
+def test_concurrent_get_user_single_query():
+    user_cache.invalidate(1)
+
+    async def run():
+        # счётчик снимается до dispose движка в run_async, который заменяет пул
+        with count_queries(async_engine.sync_engine) as counter:
+            found = await asyncio.gather(*(async_users.get_user(1) for _ in range(20)))
+        return found, counter
+
+    found, counter = run_async(run())
+    assert len({user.id for user in found}) == 1
+    assert counter['statements'] == 1
+
+
+def test_read_started_before_invalidation_not_cached():
+    """Строка, прочитанная до записи, не попадает в кэш после инвалидации, новое чтение - попадает"""
+    cache = UserCache(MemoryCache(10), ttl=60, negative_ttl=5, max_tracked=1)
+    user = UserData(id=1, email='a@reqres.in', first_name='A', last_name='B', avatar='', job='')
+
+    generation = cache.generation()
+    cache.invalidate(1)
+    cache.set(1, user, generation)
+    assert cache.get(1) == (False, None)
+
+    generation = cache.generation()
+    # вытесненная из учёта инвалидация всё равно не даёт положить более старое чтение
+    cache.invalidate(2)
+    cache.invalidate(3)
+    cache.set(2, user, generation)
+    assert cache.get(2) == (False, None)
+
+    cache.set(1, user, cache.generation())
+    assert cache.get(1)[1].id == 1
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from app.database.batching import CreateBatcher
+from app.models.user import UserCreateData, UserData
+
+
+def make_batcher(max_size: int = 10, max_delay: float = 0.01, fail: bool = False):
+    batches = []
+
+    async def write(new_users: list[UserCreateData]) -> list[UserData]:
+        # id выделяются до await, как при INSERT: пачки пишутся одновременно
+        start = sum(batches)
+        batches.append(len(new_users))
+        await asyncio.sleep(0.01)
+        if fail:
+            raise RuntimeError('db is down')
+        return [UserData(id=start + i + 1, email='', first_name=user.name, last_name='', avatar='', job=user.job)
+                for i, user in enumerate(new_users)]
+
+    return CreateBatcher(write, max_size, max_delay, enabled=True), batches
+
+
+def new_user(i: int) -> UserCreateData:
+    return UserCreateData(name=f'user {i}', job='QA')
+
+
+def test_each_request_gets_own_id():
+    """Запросы одной пачки получают id своей строки, в порядке поступления"""
+    batcher, batches = make_batcher(max_size=10)
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit(new_user(i)) for i in range(25)))
+
+    created = asyncio.run(run())
+    assert [user.id for user in created] == list(range(1, 26))
+    assert [user.first_name for user in created] == [f'user {i}' for i in range(25)]
+    assert batches == [10, 10, 5]
+
+
+def test_partial_batch_flushed_by_timer():
+    batcher, batches = make_batcher(max_size=100, max_delay=0.02)
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit(new_user(i)) for i in range(3)))
+
+    assert len(asyncio.run(run())) == 3
+    assert batches == [3]
+
+
+def test_batch_error_propagates_to_every_request():
+    batcher, _ = make_batcher(fail=True)
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit(new_user(i)) for i in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(run()))
+
+
+def test_drain_writes_pending_and_rejects_new():
+    """Остановка записывает накопленные запросы, не дожидаясь таймера, и закрывает приём"""
+    batcher, batches = make_batcher(max_size=100, max_delay=60)
+
+    async def run():
+        pending = [asyncio.ensure_future(batcher.submit(new_user(i))) for i in range(4)]
+        await asyncio.sleep(0)
+        await batcher.drain()
+        assert all(task.done() for task in pending)
+        with pytest.raises(RuntimeError):
+            await batcher.submit(new_user(5))
+
+    asyncio.run(run())
+    assert batches == [4]
+
+
+def test_cancelled_write_fails_requests():
+    """Отмена записи пачки завершает ожидающие запросы ошибкой, а не оставляет их висеть"""
+    started = []
+
+    async def write(new_users: list[UserCreateData]) -> list[UserData]:
+        started.append(len(new_users))
+        await asyncio.sleep(60)
+
+    batcher = CreateBatcher(write, max_size=2, max_delay=60, enabled=True)
+
+    async def run():
+        pending = [asyncio.ensure_future(batcher.submit(new_user(i))) for i in range(2)]
+        await asyncio.sleep(0.01)
+        for task in batcher._flushes:
+            task.cancel()
+        return await asyncio.wait_for(asyncio.gather(*pending, return_exceptions=True), 1)
+
+    results = asyncio.run(run())
+    assert started == [2]
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_batcher_accepts_again_after_restart():
+    """Батчер модульный: после остановки одного lifespan следующий снова принимает запросы"""
+    batcher, batches = make_batcher()
+
+    async def run():
+        await batcher.drain()
+        batcher.start()
+        return await batcher.submit(new_user(1))
+
+    assert asyncio.run(run()).first_name == 'user 1'
+    assert batches == [1]
@@ -1,6 +1,7 @@
 import logging
 
 import curlify
+from httpx import AsyncClient, Limits
 from requests import Session
 
 
@@ -14,3 +15,15 @@ class BaseSession(Session):
         response = super().request(method, url, **kwargs)
         logging.info(curlify.to_curl(response.request))
         return response
+
+
+class AsyncBaseSession(AsyncClient):
+    """
+    Асинхронная сессия с пулом keep-alive соединений для нагрузочных прогонов: без curlify на каждый запрос.
+    Для запуска приложения в процессе передаётся transport=httpx.ASGITransport(app=app)
+    """
+
+    def __init__(self, base_url: str, max_connections: int = 100, **kwargs):
+        super().__init__(base_url=base_url,
+                         limits=Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+                         **kwargs)
@@ -1,27 +1,154 @@
+import csv
+import json
+from typing import Iterator
+
+import httpx
 from requests import Response
 
 from config import Server
-from utils.base_session import BaseSession
+from utils.base_session import AsyncBaseSession, BaseSession
 
 
 class FastApiApp:
     def __init__(self, env):
         self.session = BaseSession(base_url=Server(env).app)
 
-    def get_user_by_id(self, user_id: int) -> Response:
-        return self.session.get(f'/api/users/{user_id}')
+    def get_user_by_id(self, user_id: int, headers: dict | None = None, params=None) -> Response:
+        return self.session.get(f'/api/users/{user_id}', params=params, headers=headers)
 
-    def get_all_users(self, params=None) -> Response:
-        return self.session.get('/api/users/', params=params)
+    def get_all_users(self, params=None, headers: dict | None = None) -> Response:
+        return self.session.get('/api/users/', params=params, headers=headers)
 
     def create_user(self, user: dict) -> Response:
         return self.session.post('/api/users/', json=user)
 
-    def update_user(self, user_id: int, user: dict) -> Response:
-        return self.session.patch(f'/api/users/{user_id}', json=user)
+    def update_user(self, user_id: int, user: dict, headers: dict | None = None) -> Response:
+        return self.session.patch(f'/api/users/{user_id}', json=user, headers=headers)
+
+    def delete_user(self, user_id: int, headers: dict | None = None) -> Response:
+        return self.session.delete(f'/api/users/{user_id}', headers=headers)
+
+    def create_users(self, users: list[dict]) -> Response:
+        return self.session.post('/api/users/batch', json=users)
+
+    def get_users_by_ids(self, user_ids: list[int]) -> Response:
+        return self.session.get('/api/users/batch', params={'ids': user_ids})
+
+    def update_users(self, users: list[dict]) -> Response:
+        return self.session.patch('/api/users/batch', json=users)
+
+    def delete_users(self, user_ids: list[int]) -> Response:
+        return self.session.delete('/api/users/batch', params={'ids': user_ids})
+
+    def export_users(self, params=None) -> Response:
+        return self.session.get('/api/users/export', params=params, stream=True)
+
+    def iter_exported_users(self, params=None) -> Iterator[dict]:
+        """
+        Чтение выгрузки пользователей построчно, без загрузки всего ответа в память
+        """
+        params = params or {}
+        with self.export_users(params) as response:
+            response.raise_for_status()
+            lines = response.iter_lines(decode_unicode=True)
+            if params.get('format') == 'csv':
+                yield from csv.DictReader(lines)
+            else:
+                yield from (json.loads(line) for line in lines if line)
 
-    def delete_user(self, user_id: int) -> Response:
-        return self.session.delete(f'/api/users/{user_id}')
+    def get_changes(self, after: int | None = None, last_event_id: int | None = None) -> Response:
+        headers = {'Last-Event-ID': str(last_event_id)} if last_event_id is not None else None
+        params = {'after': after} if after is not None else None
+        return self.session.get('/api/users/changes', params=params, headers=headers, stream=True)
+
+    def iter_changes(self, after: int | None = None, last_event_id: int | None = None) -> Iterator[dict]:
+        """
+        Подписка на изменения пользователей: запрос отправляется сразу, итератор отдаёт словари с id, event
+        и data (разобранный JSON) по каждому событию. id последнего события передаётся в last_event_id
+        при переподключении
+        """
+        response = self.get_changes(after, last_event_id)
+        response.raise_for_status()
+        return self._iter_events(response)
+
+    @staticmethod
+    def _iter_events(response: Response) -> Iterator[dict]:
+        with response:
+            event = {}
+            for line in response.iter_lines(decode_unicode=True):
+                if line:
+                    field, _, value = line.partition(':')
+                    if field:
+                        event[field] = value.removeprefix(' ')
+                    continue
+                if 'data' in event:
+                    yield {'id': int(event['id']), 'event': event.get('event', 'message'),
+                           'data': json.loads(event['data'])}
+                event = {}
 
     def get_status(self) -> Response:
         return self.session.get('/status')
+
+    def get_liveness(self) -> Response:
+        return self.session.get('/health/live')
+
+    def get_readiness(self) -> Response:
+        return self.session.get('/health/ready')
+
+    def get_cache_status(self) -> Response:
+        return self.session.get('/status/cache')
+
+    def get_admission_status(self) -> Response:
+        return self.session.get('/status/admission')
+
+    def get_metrics(self) -> Response:
+        return self.session.get('/metrics')
+
+
+class AsyncFastApiApp:
+    """
+    Асинхронный клиент сервиса для нагрузочных прогонов: живой стенд из config.Server
+    или приложение в том же процессе через ASGI-транспорт
+    """
+
+    def __init__(self, session: AsyncBaseSession):
+        self.session = session
+
+    @classmethod
+    def from_env(cls, env: str, max_connections: int = 100) -> 'AsyncFastApiApp':
+        return cls(AsyncBaseSession(Server(env).app, max_connections=max_connections))
+
+    @classmethod
+    def from_asgi(cls, app, max_connections: int = 100) -> 'AsyncFastApiApp':
+        return cls(AsyncBaseSession('http://testserver', max_connections=max_connections,
+                                    transport=httpx.ASGITransport(app=app)))
+
+    async def get_user_by_id(self, user_id: int) -> httpx.Response:
+        return await self.session.get(f'/api/users/{user_id}')
+
+    async def get_all_users(self, params=None, headers: dict | None = None) -> httpx.Response:
+        return await self.session.get('/api/users/', params=params, headers=headers)
+
+    async def create_user(self, user: dict) -> httpx.Response:
+        return await self.session.post('/api/users/', json=user)
+
+    async def create_users(self, users: list[dict]) -> httpx.Response:
+        return await self.session.post('/api/users/batch', json=users)
+
+    async def update_user(self, user_id: int, user: dict) -> httpx.Response:
+        return await self.session.patch(f'/api/users/{user_id}', json=user)
+
+    async def delete_user(self, user_id: int) -> httpx.Response:
+        return await self.session.delete(f'/api/users/{user_id}')
+
+    async def get_status(self) -> httpx.Response:
+        return await self.session.get('/status')
+
+    async def close(self):
+        await self.session.aclose()
+
+    async def __aenter__(self) -> 'AsyncFastApiApp':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()